@@ -0,0 +1,202 @@
+"""Background processing of bulk notification jobs"""
+import asyncio
+import uuid
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
+
+from . import models, schemas, config
+from .database import AsyncSessionLocal
+from .dispatch import copy_rows, queue_bulk_notifications
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("bulk-jobs")
+
+# Failed recipients beyond this are counted but not listed in job progress
+MAX_REPORTED_FAILURES = 100
+
+async def create_bulk_job(
+    db: AsyncSession,
+    bulk_request: schemas.BulkNotificationRequest,
+    correlation_id: str
+) -> models.BulkJob:
+    """Persist a bulk job and its recipient list, ready to be processed"""
+    job = models.BulkJob(
+        id=str(uuid.uuid4()),
+        correlation_id=correlation_id,
+        notification_type=bulk_request.notification_type.value,
+        template_code=bulk_request.template_code,
+        variables=bulk_request.variables,
+        priority=0,
+        status=models.BulkJobStatus.pending,
+        total=len(bulk_request.user_ids)
+    )
+    db.add(job)
+    await db.flush()
+
+    await copy_rows(
+        db,
+        models.BulkJobRecipient.__tablename__,
+        ["job_id", "user_id"],
+        [{"job_id": job.id, "user_id": user_id} for user_id in bulk_request.user_ids]
+    )
+    await db.commit()
+    return job
+
+async def load_bulk_job_failures(db: AsyncSession, job_id: str) -> List[schemas.BulkRecipientFailure]:
+    """The first failed recipients of a job, in recipient order"""
+    rows = (await db.execute(
+        select(models.BulkJobRecipient.user_id, models.BulkJobRecipient.error_message)
+        .where(
+            models.BulkJobRecipient.job_id == job_id,
+            models.BulkJobRecipient.error_message.is_not(None)
+        )
+        .order_by(models.BulkJobRecipient.id)
+        .limit(MAX_REPORTED_FAILURES)
+    )).all()
+    return [schemas.BulkRecipientFailure(user_id=str(user_id), error=error) for user_id, error in rows]
+
+class BulkJobRunner:
+    """Works through bulk jobs chunk by chunk in background tasks.
+
+    Each chunk's notifications, outbox rows and job counters are committed
+    together under a row lock on the job, so progress is exact and a job
+    interrupted by a restart resumes from its cursor without resending.
+    """
+
+    def __init__(self, chunk_size: int = 1000, max_concurrent_jobs: int = 4):
+        self.chunk_size = chunk_size
+        self._slots = asyncio.Semaphore(max_concurrent_jobs)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    async def start(self):
+        """Resume jobs left unfinished by a previous run"""
+        self._stopping = False
+        async with AsyncSessionLocal() as db:
+            job_ids = (await db.execute(
+                select(models.BulkJob.id)
+                .where(models.BulkJob.status.in_([models.BulkJobStatus.pending, models.BulkJobStatus.running]))
+                .order_by(models.BulkJob.created_at)
+            )).scalars().all()
+
+        for job_id in job_ids:
+            self.submit(job_id)
+        if job_ids:
+            logger.info(f"Resumed {len(job_ids)} unfinished bulk jobs")
+
+    def submit(self, job_id: str):
+        """Schedule a job for processing"""
+        if self._stopping or job_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def stop(self):
+        """Stop after the chunks in progress; remaining work resumes on restart"""
+        self._stopping = True
+        tasks = list(self._tasks.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"Stopped {len(tasks)} bulk jobs in progress")
+
+    async def _run(self, job_id: str):
+        async with self._slots:
+            logger.info(f"Processing bulk job {job_id}")
+            try:
+                while not self._stopping:
+                    if not await self.process_chunk(job_id):
+                        break
+            except Exception as e:
+                logger.error(f"Bulk job {job_id} failed: {str(e)}")
+                await self._mark_failed(job_id, str(e))
+
+    async def process_chunk(self, job_id: str) -> bool:
+        """Queue the next chunk of a job, returns False once the job is finished"""
+        async with AsyncSessionLocal() as db:
+            # The lock serialises chunks of a job across gateway replicas
+            job = (await db.execute(
+                select(models.BulkJob)
+                .where(models.BulkJob.id == job_id)
+                .with_for_update()
+            )).scalar_one_or_none()
+            if job is None or job.status in (models.BulkJobStatus.completed, models.BulkJobStatus.failed):
+                return False
+
+            recipients = (await db.execute(
+                select(models.BulkJobRecipient.id, models.BulkJobRecipient.user_id)
+                .where(
+                    models.BulkJobRecipient.job_id == job_id,
+                    models.BulkJobRecipient.id > job.last_recipient_id
+                )
+                .order_by(models.BulkJobRecipient.id)
+                .limit(self.chunk_size)
+            )).all()
+
+            now = datetime.utcnow()
+            if not recipients:
+                job.status = models.BulkJobStatus.completed
+                job.completed_at = now
+                job.updated_at = now
+                await db.commit()
+                logger.info(f"Bulk job {job_id} completed: {job.queued} queued, {job.failed} failed")
+                return False
+
+            notifications = [
+                schemas.NotificationRequest(
+                    notification_type=job.notification_type,
+                    user_id=user_id,
+                    template_code=job.template_code,
+                    variables=job.variables,
+                    request_id=str(uuid.uuid4()),
+                    priority=job.priority
+                )
+                for _, user_id in recipients
+            ]
+            queued, failed = await queue_bulk_notifications(db, notifications, job.correlation_id)
+            if failed:
+                await db.execute(update(models.BulkJobRecipient), [
+                    {"id": recipients[failure["index"]][0], "error_message": failure["error"]}
+                    for failure in failed
+                ])
+
+            job.status = models.BulkJobStatus.running
+            job.queued += len(queued)
+            job.failed += len(failed)
+            job.last_recipient_id = recipients[-1][0]
+            job.updated_at = now
+            await db.commit()
+
+            logger.info(f"Bulk job {job_id}: chunk of {len(recipients)} processed ({len(queued)} queued, {len(failed)} failed)")
+            return True
+
+    async def _mark_failed(self, job_id: str, error: str):
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(models.BulkJob)
+                    .where(models.BulkJob.id == job_id)
+                    .values(
+                        status=models.BulkJobStatus.failed,
+                        error_message=error,
+                        updated_at=datetime.utcnow()
+                    )
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error marking bulk job {job_id} as failed: {str(e)}")
+
+# Global bulk job runner instance
+bulk_job_runner = None
+
+def get_bulk_job_runner() -> BulkJobRunner:
+    """Get or create bulk job runner instance"""
+    global bulk_job_runner
+    if bulk_job_runner is None:
+        bulk_job_runner = BulkJobRunner(
+            chunk_size=config.BULK_JOB_CHUNK_SIZE,
+            max_concurrent_jobs=config.BULK_JOB_CONCURRENCY
+        )
+    return bulk_job_runner
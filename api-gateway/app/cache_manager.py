@@ -1,35 +1,104 @@
 """Redis cache manager for user preferences and idempotency"""
-import redis
+import redis.asyncio as redis
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, NamedTuple, Tuple
 
 from .utils.logging_config import setup_logging
 
 logger = setup_logging("cache-manager")
 
+# Generic cell rate algorithm over several buckets at once, shared by the
+# preflight and the rate limiter. Each bucket stores its theoretical
+# arrival time (TAT) in ms. A bucket grants the requested tokens, or as
+# many as fit down to one; nothing is charged unless every bucket can
+# grant at least one token.
+# Buckets are KEYS[first_key..] with (emission interval ms, burst,
+# requested tokens) per bucket in ARGV from first_arg.
+# Returns {1, granted...} or {0, retry after ms, index of the denying bucket}
+GCRA_LUA = """
+local function gcra(first_key, first_arg)
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+    local count = #KEYS - first_key + 1
+    local tats, grants = {}, {}
+    for i = 1, count do
+        local arg = first_arg + (i - 1) * 3
+        local interval = tonumber(ARGV[arg])
+        local burst = tonumber(ARGV[arg + 1])
+        local requested = tonumber(ARGV[arg + 2])
+        local tat = math.max(tonumber(redis.call('GET', KEYS[first_key + i - 1])) or now, now)
+        local available = math.floor((now + burst * interval - tat) / interval)
+        if available < 1 then
+            return {0, math.ceil(tat + interval - burst * interval - now), i}
+        end
+        tats[i] = tat
+        grants[i] = math.min(requested, available)
+    end
+    local result = {1}
+    for i = 1, count do
+        local interval = tonumber(ARGV[first_arg + (i - 1) * 3])
+        local new_tat = tats[i] + grants[i] * interval
+        redis.call('SET', KEYS[first_key + i - 1], string.format('%.3f', new_tat), 'PX', math.max(math.ceil(new_tat - now), 1))
+        result[#result + 1] = grants[i]
+    end
+    return result
+end
+"""
+
+# Reserves the idempotency key, reads the cached user record (with its
+# remaining TTL) and takes rate limit tokens in one atomic server-side
+# call. Duplicates are not charged.
+# KEYS: idempotency key, user cache key, then rate limit buckets
+# ARGV: idempotency ttl, then the GCRA arguments per bucket
+PREFLIGHT_SCRIPT = GCRA_LUA + """
+local verdict = 'ok'
+if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[1]) then
+    verdict = 'duplicate'
+end
+local limit = {1}
+if verdict == 'ok' and #KEYS > 2 then
+    limit = gcra(3, 2)
+end
+return {verdict, redis.call('GET', KEYS[2]), redis.call('PTTL', KEYS[2]), limit}
+"""
+
+class PreflightResult(NamedTuple):
+    """Verdict of the ingest preflight: 'ok' or 'duplicate'.
+
+    rate_limit is the GCRA reply for the buckets passed in, or None if
+    none were passed, the request was a duplicate or Redis failed.
+    """
+    verdict: str
+    user_data: Optional[Dict[str, Any]] = None
+    user_ttl_ms: Optional[int] = None
+    rate_limit: Optional[List[int]] = None
+
 class CacheManager:
     """Manages Redis caching operations"""
     
     def __init__(self, redis_url: str):
         self.redis_url = redis_url
         self.client = None
+        self.preflight_script = None
     
-    def connect(self):
+    async def connect(self):
         """Establish connection to Redis"""
         try:
             if self.client is None:
-                self.client = redis.from_url(self.redis_url, decode_responses=True)
-                self.client.ping()
+                client = redis.from_url(self.redis_url, decode_responses=True)
+                await client.ping()
+                self.preflight_script = client.register_script(PREFLIGHT_SCRIPT)
+                self.client = client
                 logger.info("Connected to Redis")
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {str(e)}")
             raise
     
-    def get(self, key: str) -> Optional[Any]:
+    async def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
         try:
-            self.connect()
-            value = self.client.get(key)
+            await self.connect()
+            value = await self.client.get(key)
             if value:
                 return json.loads(value)
             return None
@@ -37,53 +106,96 @@ class CacheManager:
             logger.error(f"Error getting from cache: {str(e)}")
             return None
     
-    def set(self, key: str, value: Any, ttl: int = 3600):
+    async def set(self, key: str, value: Any, ttl: int = 3600):
         """Set value in cache with TTL"""
         try:
-            self.connect()
-            self.client.setex(key, ttl, json.dumps(value))
+            await self.connect()
+            await self.client.setex(key, ttl, json.dumps(value))
         except Exception as e:
             logger.error(f"Error setting cache: {str(e)}")
     
-    def delete(self, key: str):
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get many values from cache with a single MGET"""
+        if not keys:
+            return []
+        try:
+            await self.connect()
+            values = await self.client.mget(keys)
+            return [json.loads(value) if value else None for value in values]
+        except Exception as e:
+            logger.error(f"Error getting many from cache: {str(e)}")
+            return [None] * len(keys)
+    
+    async def set_many(self, values: Dict[str, Any], ttl: int = 3600):
+        """Set many values with TTL in one pipelined round-trip"""
+        if not values:
+            return
+        try:
+            await self.connect()
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    pipe.setex(key, ttl, json.dumps(value))
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error setting many in cache: {str(e)}")
+    
+    async def delete(self, key: str):
         """Delete key from cache"""
         try:
-            self.connect()
-            self.client.delete(key)
+            await self.connect()
+            await self.client.delete(key)
         except Exception as e:
             logger.error(f"Error deleting from cache: {str(e)}")
     
-    def check_idempotency(self, request_id: str) -> bool:
-        """Check if request has already been processed (idempotency check)"""
+    async def delete_many(self, keys: List[str]):
+        """Delete many keys from cache in one round-trip"""
+        if not keys:
+            return
         try:
-            self.connect()
-            key = f"idempotency:{request_id}"
-            exists = self.client.exists(key)
-            return exists > 0
+            await self.connect()
+            await self.client.delete(*keys)
         except Exception as e:
-            logger.error(f"Error checking idempotency: {str(e)}")
-            return False
+            logger.error(f"Error deleting many from cache: {str(e)}")
+    
+    async def release_idempotency(self, request_id: str):
+        """Release an idempotency reservation so the request can be retried"""
+        await self.delete(f"idempotency:{request_id}")
     
-    def set_idempotency(self, request_id: str, ttl: int = 86400):
-        """Mark request as processed for idempotency"""
+    async def preflight(
+        self,
+        request_id: str,
+        user_cache_key: str,
+        idempotency_ttl: int = 86400,
+        rate_limit: Optional[Tuple[List[str], List[Any]]] = None
+    ) -> PreflightResult:
+        """Reserve idempotency key, fetch cached user and take rate limit tokens in one round-trip.
+
+        rate_limit is the (bucket keys, GCRA arguments) pair from RateLimiter.script_inputs.
+        """
         try:
-            self.connect()
-            key = f"idempotency:{request_id}"
-            self.client.setex(key, ttl, "1")
+            await self.connect()
+            bucket_keys, bucket_args = rate_limit or ([], [])
+            verdict, user_value, user_ttl, limit = await self.preflight_script(
+                keys=[f"idempotency:{request_id}", user_cache_key, *bucket_keys],
+                args=[idempotency_ttl, *bucket_args]
+            )
+            rate_limit = [int(value) for value in limit] if bucket_keys and verdict == "ok" else None
+            if not user_value:
+                return PreflightResult(verdict, rate_limit=rate_limit)
+            return PreflightResult(verdict, json.loads(user_value), user_ttl, rate_limit)
         except Exception as e:
-            logger.error(f"Error setting idempotency: {str(e)}")
+            logger.error(f"Error running preflight: {str(e)}")
+            return PreflightResult("ok")  # Allow on error, the DB check still catches duplicates
     
-    def rate_limit_check(self, key: str, limit: int, window: int) -> bool:
-        """Check rate limit using sliding window"""
+    async def close(self):
+        """Close Redis connection pool"""
         try:
-            self.connect()
-            current = self.client.incr(key)
-            if current == 1:
-                self.client.expire(key, window)
-            return current <= limit
+            if self.client is not None:
+                await self.client.close()
+                self.client = None
+                logger.info("Redis connection closed")
         except Exception as e:
-            logger.error(f"Error checking rate limit: {str(e)}")
-            return True  # Allow on error
+            logger.error(f"Error closing Redis connection: {str(e)}")
 
 # Global cache manager instance
 cache_manager = None
@@ -1,4 +1,5 @@
 import os
+import json
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
@@ -15,4 +16,75 @@ ALGORITHM = "HS256"
 EMAIL_QUEUE = "email.queue"
 PUSH_QUEUE = "push.queue"
 FAILED_QUEUE = "failed.queue"
+STATUS_QUEUE = "status.queue"
 EXCHANGE_NAME = "notifications.direct"
+
+# Outbox relay configuration
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "0.5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+
+# Number of publisher channels shared by concurrent publishes
+RABBITMQ_CHANNEL_POOL_SIZE = int(os.getenv("RABBITMQ_CHANNEL_POOL_SIZE", "8"))
+
+# Bulk job processing
+BULK_JOB_CHUNK_SIZE = int(os.getenv("BULK_JOB_CHUNK_SIZE", "1000"))
+BULK_JOB_CONCURRENCY = int(os.getenv("BULK_JOB_CONCURRENCY", "4"))
+
+# Streaming NDJSON ingestion
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1000"))
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", "65536"))
+INGEST_OUTBOX_HIGH_WATERMARK = int(os.getenv("INGEST_OUTBOX_HIGH_WATERMARK", "50000"))
+
+# How long a user's notification count is cached for paginated history
+NOTIFICATION_COUNT_CACHE_TTL = int(os.getenv("NOTIFICATION_COUNT_CACHE_TTL", "60"))
+
+# Status event consumer
+STATUS_CONSUMER_BATCH_SIZE = int(os.getenv("STATUS_CONSUMER_BATCH_SIZE", "500"))
+STATUS_CONSUMER_FLUSH_INTERVAL = float(os.getenv("STATUS_CONSUMER_FLUSH_INTERVAL", "0.2"))
+# Failed batch attempts before events are applied one by one and poison ones parked
+STATUS_CONSUMER_MAX_ATTEMPTS = int(os.getenv("STATUS_CONSUMER_MAX_ATTEMPTS", "3"))
+
+# Write-behind status store: status updates go to Redis and are flushed to the database in bulk
+STATUS_WRITE_BEHIND = os.getenv("STATUS_WRITE_BEHIND", "false").lower() == "true"
+STATUS_STORE_FLUSH_INTERVAL = float(os.getenv("STATUS_STORE_FLUSH_INTERVAL", "1.0"))
+STATUS_STORE_BATCH_SIZE = int(os.getenv("STATUS_STORE_BATCH_SIZE", "1000"))
+STATUS_STORE_TTL = int(os.getenv("STATUS_STORE_TTL", "3600"))
+
+# How long serialized notification responses are cached for status polling
+NOTIFICATION_CACHE_TTL = int(os.getenv("NOTIFICATION_CACHE_TTL", "300"))
+
+# Seconds between keep-alive comments on idle server-sent event streams
+SSE_KEEPALIVE_INTERVAL = float(os.getenv("SSE_KEEPALIVE_INTERVAL", "15"))
+
+# In-process user cache in front of Redis
+USER_LOCAL_CACHE_SIZE = int(os.getenv("USER_LOCAL_CACHE_SIZE", "10000"))
+USER_LOCAL_CACHE_TTL = float(os.getenv("USER_LOCAL_CACHE_TTL", "30"))
+
+# Coalescing of concurrent user-service lookups for the same user
+USER_LOOKUP_LOCK_TTL_MS = int(os.getenv("USER_LOOKUP_LOCK_TTL_MS", "2000"))
+USER_EARLY_REFRESH_BETA = float(os.getenv("USER_EARLY_REFRESH_BETA", "1.0"))
+
+# Pooled HTTP clients for upstream services
+USER_SERVICE_MAX_CONNECTIONS = int(os.getenv("USER_SERVICE_MAX_CONNECTIONS", "200"))
+USER_SERVICE_MAX_KEEPALIVE = int(os.getenv("USER_SERVICE_MAX_KEEPALIVE", "50"))
+TEMPLATE_SERVICE_MAX_CONNECTIONS = int(os.getenv("TEMPLATE_SERVICE_MAX_CONNECTIONS", "50"))
+TEMPLATE_SERVICE_MAX_KEEPALIVE = int(os.getenv("TEMPLATE_SERVICE_MAX_KEEPALIVE", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2.0"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10.0"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_RETRY_BUDGET_RATIO = float(os.getenv("HTTP_RETRY_BUDGET_RATIO", "0.1"))
+
+# ETag cache for user and template proxy reads
+PROXY_CACHE_TTL = int(os.getenv("PROXY_CACHE_TTL", "300"))
+PROXY_CACHE_FRESH_SECONDS = float(os.getenv("PROXY_CACHE_FRESH_SECONDS", "5"))
+
+# Rate limit policies as "limit/period seconds[/burst]"; empty disables a scope.
+# RATE_LIMIT_OVERRIDES maps "scope:identifier" to a policy, e.g.
+# {"api_key:partner-a": "6000/60", "template:password_reset": "20/60"}
+RATE_LIMIT_USER = os.getenv("RATE_LIMIT_USER", "100/60")
+RATE_LIMIT_TEMPLATE = os.getenv("RATE_LIMIT_TEMPLATE", "6000/60")
+RATE_LIMIT_API_KEY = os.getenv("RATE_LIMIT_API_KEY", "1200/60")
+RATE_LIMIT_OVERRIDES = json.loads(os.getenv("RATE_LIMIT_OVERRIDES", "{}"))
+# Seconds of refill taken from Redis at once and spent in process
+RATE_LIMIT_LEASE_SECONDS = float(os.getenv("RATE_LIMIT_LEASE_SECONDS", "1.0"))
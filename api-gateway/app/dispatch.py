@@ -0,0 +1,142 @@
+"""Persist notifications and stage their queue messages in the outbox"""
+import json
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, List, Optional, Tuple
+
+from . import models, schemas, config
+from .queue_manager import priority_routing_key
+from .user_lookup import resolve_users
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("dispatch")
+
+NOTIFICATION_COLUMNS = [column.name for column in models.NotificationRequest.__table__.columns]
+OUTBOX_COLUMNS = [column.name for column in models.OutboxMessage.__table__.columns if column.name != "id"]
+JSON_COLUMNS = {"variables", "extra_metadata", "payload"}
+
+def recipient_for(notification_type: schemas.NotificationType, user_data: Dict[str, Any]) -> Optional[str]:
+    """Pick the email address or push token for the channel"""
+    if notification_type == schemas.NotificationType.email:
+        return user_data.get("email")
+    if notification_type == schemas.NotificationType.push:
+        return user_data.get("push_token")
+    return None
+
+def notification_row(
+    notification: schemas.NotificationRequest,
+    correlation_id: str,
+    recipient: str
+) -> Dict[str, Any]:
+    """Column values for a new pending notification"""
+    return {
+        "request_id": notification.request_id,
+        "correlation_id": correlation_id,
+        "user_id": notification.user_id,
+        "notification_type": notification.notification_type.value,
+        "template_code": notification.template_code,
+        "recipient": recipient,
+        "variables": notification.variables,  # Already a dict
+        "status": models.NotificationStatus.pending,
+        "priority": notification.priority,
+        "extra_metadata": notification.extra_metadata
+    }
+
+def outbox_entry(notification_id: int, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the outbox row (and queue message) for a stored notification"""
+    return {
+        "notification_id": notification_id,
+        "exchange": config.EXCHANGE_NAME,
+        "routing_key": priority_routing_key(row["notification_type"], row["priority"]),  # e.g. 'email', 'push.urgent'
+        "correlation_id": row["correlation_id"],
+        "payload": {
+            "notification_id": notification_id,
+            "request_id": row["request_id"],
+            "correlation_id": row["correlation_id"],
+            "user_id": str(row["user_id"]),
+            "notification_type": row["notification_type"],
+            "template_code": row["template_code"],
+            "recipient": row["recipient"],
+            "variables": row["variables"],
+            "priority": row["priority"],
+            "extra_metadata": row["extra_metadata"],
+            "retry_count": 0
+        }
+    }
+
+async def copy_rows(db: AsyncSession, table: str, columns: List[str], rows: List[Dict[str, Any]]):
+    """Stream rows into a table with COPY on the session's connection"""
+    records = [
+        tuple(json.dumps(row[column]) if column in JSON_COLUMNS else row[column] for column in columns)
+        for row in rows
+    ]
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(table, records=records, columns=columns)
+
+async def queue_bulk_notifications(
+    db: AsyncSession,
+    notifications: List[schemas.NotificationRequest],
+    correlation_id: str
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    """Store and queue many notifications in the session's transaction.
+
+    Users are resolved in bulk, notification and outbox rows are written
+    with COPY, and the outbox relay publishes them in confirm-batched
+    groups once the caller commits. COPY has no ON CONFLICT, so request_ids
+    must be freshly generated. Returns the stored notification rows and
+    per-user failures, each with the index of its notification.
+    """
+    users, user_errors = await resolve_users([notification.user_id for notification in notifications])
+
+    rows = []
+    failed = []
+    for index, notification in enumerate(notifications):
+        user_id = str(notification.user_id)
+        if user_id in user_errors:
+            failed.append({"index": index, "user_id": user_id, "error": user_errors[user_id]})
+            continue
+
+        recipient = recipient_for(notification.notification_type, users[user_id])
+        if not recipient:
+            failed.append({
+                "index": index,
+                "user_id": user_id,
+                "error": f"No {notification.notification_type.value} recipient found for user"
+            })
+            continue
+
+        rows.append(notification_row(notification, correlation_id, recipient))
+
+    if not rows:
+        return [], failed
+
+    # Reserve ids up front so both tables can be loaded with COPY
+    ids = (await db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('notification_requests', 'id')) FROM generate_series(1, :count)"),
+        {"count": len(rows)}
+    )).scalars().all()
+
+    now = datetime.utcnow()
+    for notification_id, row in zip(ids, rows):
+        row.update(
+            id=notification_id,
+            status=models.NotificationStatus.pending.value,
+            error_message=None,
+            retry_count=0,
+            created_at=now,
+            updated_at=now,
+            sent_at=None,
+            status_updated_at=None
+        )
+
+    await copy_rows(db, models.NotificationRequest.__tablename__, NOTIFICATION_COLUMNS, rows)
+    await copy_rows(
+        db,
+        models.OutboxMessage.__tablename__,
+        OUTBOX_COLUMNS,
+        [dict(outbox_entry(row["id"], row), attempts=0, last_error=None, created_at=now) for row in rows]
+    )
+
+    return rows, failed
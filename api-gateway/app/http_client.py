@@ -0,0 +1,182 @@
+"""Shared pooled HTTP clients for calls to upstream services"""
+import asyncio
+import httpx
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Dict
+
+from . import config
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("http-client")
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRYABLE_STATUSES = {502, 503, 504}
+
+# Connection-level headers that must not be forwarded by a proxy
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade"
+}
+
+class RetryBudget:
+    """Caps retries to a fraction of recent requests.
+
+    Every request deposits `ratio` of a retry and every retry withdraws a
+    whole one, so an unhealthy upstream sees at most about (1 + ratio)
+    times its normal load instead of a retry storm.
+    """
+
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+class UpstreamClient:
+    """Keep-alive connection pool to one upstream service, with budgeted retries"""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 10.0,
+        max_retries: int = 2,
+        retry_ratio: float = 0.1
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.budget = RetryBudget(ratio=retry_ratio)
+        self.client = None
+
+    def _client(self) -> httpx.AsyncClient:
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive
+                )
+            )
+        return self.client
+
+    async def send(self, method: str, path: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """Send a request, retrying transient failures while the budget allows.
+
+        Idempotent methods are retried on transport errors and 502/503/504;
+        other methods only when the connection could not be established, so
+        the upstream never sees them twice. With stream=True the body is not
+        read and the caller must close the response.
+        """
+        client = self._client()
+        request = client.build_request(method, path, **kwargs)
+        self.budget.deposit()
+
+        attempt = 0
+        while True:
+            try:
+                response = await client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if not self._may_retry(method, attempt, connect_failed=isinstance(e, httpx.ConnectError)):
+                    raise
+                logger.warning(f"Retrying {method} {self.name}{path} after error: {str(e)}")
+            else:
+                if response.status_code not in RETRYABLE_STATUSES or not self._may_retry(method, attempt):
+                    return response
+                await response.aclose()
+                logger.warning(f"Retrying {method} {self.name}{path} after status {response.status_code}")
+
+            attempt += 1
+            await asyncio.sleep(0.05 * (2 ** attempt))
+
+    def _may_retry(self, method: str, attempt: int, connect_failed: bool = False) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if method.upper() not in IDEMPOTENT_METHODS and not connect_failed:
+            return False
+        return self.budget.withdraw()
+
+    async def close(self):
+        if self.client is not None and not self.client.is_closed:
+            await self.client.aclose()
+        self.client = None
+
+# Global upstream client instances, one pool per service
+upstream_clients: Dict[str, UpstreamClient] = {}
+
+def get_http_client(upstream: str = "user") -> UpstreamClient:
+    """Get or create the pooled client for an upstream service ("user" or "template")"""
+    if upstream not in upstream_clients:
+        if upstream == "user":
+            upstream_clients[upstream] = UpstreamClient(
+                "user-service",
+                config.USER_SERVICE_URL,
+                max_connections=config.USER_SERVICE_MAX_CONNECTIONS,
+                max_keepalive=config.USER_SERVICE_MAX_KEEPALIVE,
+                connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+                read_timeout=config.HTTP_READ_TIMEOUT,
+                max_retries=config.HTTP_MAX_RETRIES,
+                retry_ratio=config.HTTP_RETRY_BUDGET_RATIO
+            )
+        elif upstream == "template":
+            upstream_clients[upstream] = UpstreamClient(
+                "template-service",
+                config.TEMPLATE_SERVICE_URL,
+                max_connections=config.TEMPLATE_SERVICE_MAX_CONNECTIONS,
+                max_keepalive=config.TEMPLATE_SERVICE_MAX_KEEPALIVE,
+                connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+                read_timeout=config.HTTP_READ_TIMEOUT,
+                max_retries=config.HTTP_MAX_RETRIES,
+                retry_ratio=config.HTTP_RETRY_BUDGET_RATIO
+            )
+        else:
+            raise ValueError(f"Unknown upstream: {upstream}")
+    return upstream_clients[upstream]
+
+async def proxy_request(upstream: str, method: str, path: str, **kwargs) -> StreamingResponse:
+    """Forward a request upstream and stream the response body back unchanged.
+
+    Raises httpx.HTTPError on transport errors and error statuses, like
+    raise_for_status, so routes keep their error handling.
+    """
+    response = await get_http_client(upstream).send(method, path, stream=True, **kwargs)
+    if response.is_error:
+        await response.aclose()
+        response.raise_for_status()
+
+    headers = {
+        name: value for name, value in response.headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS
+    }
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers=headers,
+        background=BackgroundTask(response.aclose)
+    )
+
+async def close_http_client():
+    """Close every upstream client and its connection pool"""
+    for upstream, client in list(upstream_clients.items()):
+        try:
+            await client.close()
+            logger.info(f"HTTP client for {client.name} closed")
+        except Exception as e:
+            logger.error(f"Error closing HTTP client for {upstream}: {str(e)}")
+    upstream_clients.clear()
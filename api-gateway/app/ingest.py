@@ -0,0 +1,129 @@
+"""Streaming NDJSON ingestion of personalised notifications"""
+import asyncio
+import json
+import uuid
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Tuple
+
+from . import schemas, config
+from .dispatch import queue_bulk_notifications
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("ingest")
+
+# Failures beyond this are counted but not echoed back, keeping the response bounded
+MAX_REPORTED_ERRORS = 100
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int = 65536
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Yield (line_number, line) from a byte stream without buffering the whole body.
+
+    A line longer than max_line_bytes is yielded as None and the rest of
+    it is skipped rather than buffered.
+    """
+    buffer = b""
+    line_number = 0
+    skipping = False
+    async for chunk in chunks:
+        if skipping:
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                continue
+            chunk = chunk[newline + 1:]
+            skipping = False
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line if len(line) <= max_line_bytes else None
+        if len(buffer) > max_line_bytes:
+            line_number += 1
+            yield line_number, None
+            buffer = b""
+            skipping = True
+    if buffer:
+        yield line_number + 1, buffer
+
+async def wait_for_outbox_capacity(db: AsyncSession, high_watermark: int, poll_interval: float = 0.5):
+    """Block while the unpublished outbox backlog is above the high watermark.
+
+    Pausing here stops us reading the request body, so the client is
+    slowed down by TCP flow control instead of the backlog growing.
+    """
+    while True:
+        # Bounded count, so a huge backlog does not make the check itself slow
+        depth = (await db.execute(
+            text("SELECT count(*) FROM (SELECT 1 FROM notification_outbox LIMIT :limit) backlog"),
+            {"limit": high_watermark}
+        )).scalar()
+        await db.commit()
+        if depth < high_watermark:
+            return
+        logger.info(f"Outbox backlog at {depth}, pausing ingestion")
+        await asyncio.sleep(poll_interval)
+
+async def ingest_ndjson(
+    db: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    notification_type: schemas.NotificationType,
+    correlation_id: str
+) -> schemas.StreamIngestResult:
+    """Validate and queue an NDJSON upload in fixed-size chunks.
+
+    Each chunk is committed on its own, so a failure part way through
+    leaves earlier chunks queued; the result reports how far we got.
+    """
+    result = schemas.StreamIngestResult(received=0, queued=0, failed=0, errors=[])
+    pending: List[Tuple[int, schemas.NotificationRequest]] = []
+
+    def record_error(line_number: int, error: str, user_id: str = None):
+        result.failed += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(schemas.StreamIngestError(line=line_number, user_id=user_id, error=error))
+
+    async def flush():
+        await wait_for_outbox_capacity(db, config.INGEST_OUTBOX_HIGH_WATERMARK)
+        queued, failed = await queue_bulk_notifications(
+            db, [notification for _, notification in pending], correlation_id
+        )
+        await db.commit()
+
+        result.queued += len(queued)
+        for failure in failed:
+            record_error(pending[failure["index"]][0], failure["error"], failure["user_id"])
+        pending.clear()
+
+    async for line_number, line in iter_ndjson_lines(chunks, config.INGEST_MAX_LINE_BYTES):
+        if line is None:
+            result.received += 1
+            record_error(line_number, f"Line exceeds {config.INGEST_MAX_LINE_BYTES} bytes")
+            continue
+        if not line.strip():
+            continue
+        result.received += 1
+        try:
+            item = schemas.StreamNotificationItem(**json.loads(line))
+        except (ValueError, TypeError, ValidationError) as e:
+            record_error(line_number, f"Invalid line: {str(e)}")
+            continue
+
+        pending.append((line_number, schemas.NotificationRequest(
+            notification_type=notification_type,
+            user_id=item.user_id,
+            template_code=item.template_code,
+            variables=item.variables,
+            request_id=str(uuid.uuid4()),
+            priority=item.priority
+        )))
+        if len(pending) >= config.INGEST_CHUNK_SIZE:
+            await flush()
+
+    if pending:
+        await flush()
+
+    logger.info(f"Ingested stream: {result.received} received, {result.queued} queued, {result.failed} failed")
+    return result
@@ -8,13 +8,21 @@ from .database import engine
 from .routes import router as notification_router
 from .queue_manager import get_queue_manager
 from .cache_manager import get_cache_manager
+from .outbox_relay import get_outbox_relay
+from .bulk_jobs import get_bulk_job_runner
+from .status_consumer import get_status_consumer
+from .status_store import get_status_store
+from .status_events import get_status_event_hub
+from .http_client import close_http_client
+from .user_lookup import get_user_cache_listener, local_users
 from .utils.logging_config import setup_logging, set_correlation_id
 from .utils.response_models import APIResponse
 
 logger = setup_logging("api-gateway")
 
-# Create database tables
+# Create database tables, then add the columns and indexes existing ones lack
 models.Base.metadata.create_all(bind=engine)
+models.upgrade_schema(engine)
 
 app = FastAPI(
     title="API Gateway",
@@ -65,16 +73,31 @@ async def startup_event():
         
         # Setup RabbitMQ queues
         queue_mgr = get_queue_manager(config.RABBITMQ_URL)
-        queue_mgr.setup_queues(
+        await queue_mgr.setup_queues(
             exchange_name=config.EXCHANGE_NAME,
             email_queue=config.EMAIL_QUEUE,
             push_queue=config.PUSH_QUEUE,
-            failed_queue=config.FAILED_QUEUE
+            failed_queue=config.FAILED_QUEUE,
+            status_queue=config.STATUS_QUEUE
         )
         
         # Test Redis connection
         cache_mgr = get_cache_manager(config.REDIS_URL)
-        cache_mgr.connect()
+        await cache_mgr.connect()
+        
+        # Evict locally cached users when any gateway process changes one
+        get_user_cache_listener().start()
+        
+        # Start publishing queued notifications from the outbox
+        get_outbox_relay(queue_mgr).start()
+        
+        # Apply delivery status events published by the workers
+        await get_status_consumer(queue_mgr).start()
+        if config.STATUS_WRITE_BEHIND:
+            get_status_store().start()
+        
+        # Pick up bulk jobs interrupted by a restart
+        await get_bulk_job_runner().start()
         
         logger.info("API Gateway startup completed successfully")
     except Exception as e:
@@ -86,8 +109,17 @@ async def shutdown_event():
     """Cleanup on shutdown"""
     try:
         logger.info("Shutting down API Gateway...")
+        await get_bulk_job_runner().stop()
         queue_mgr = get_queue_manager(config.RABBITMQ_URL)
-        queue_mgr.close()
+        await get_outbox_relay(queue_mgr).stop()
+        await get_status_consumer(queue_mgr).stop()
+        if config.STATUS_WRITE_BEHIND:
+            await get_status_store().stop()
+        await queue_mgr.close()
+        await get_status_event_hub().close()
+        await get_user_cache_listener().stop()
+        await get_cache_manager(config.REDIS_URL).close()
+        await close_http_client()
         logger.info("API Gateway shutdown completed")
     except Exception as e:
         logger.error(f"Error during shutdown: {str(e)}")
@@ -107,26 +139,25 @@ def read_root():
     )
 
 @app.get("/api/v1/health")
-def health_check():
+async def health_check():
     """Health check endpoint"""
     try:
         # Test database connection
-        from .database import SessionLocal
+        from .database import AsyncSessionLocal
         from sqlalchemy import text
-        db = SessionLocal()
-        result = db.execute(text("SELECT 1")).scalar()
-        db.close()
+        async with AsyncSessionLocal() as db:
+            result = (await db.execute(text("SELECT 1"))).scalar()
         
         if result != 1:
             raise Exception("Database query returned unexpected result")
         
         # Test RabbitMQ connection
         queue_mgr = get_queue_manager(config.RABBITMQ_URL)
-        queue_mgr.connect()
+        await queue_mgr.connect()
         
         # Test Redis connection
         cache_mgr = get_cache_manager(config.REDIS_URL)
-        cache_mgr.connect()
+        await cache_mgr.connect()
         
         return APIResponse(
             message="API Gateway is healthy",
@@ -138,7 +169,8 @@ def health_check():
                     "database": "ok",
                     "rabbitmq": "ok",
                     "redis": "ok"
-                }
+                },
+                "user_cache": local_users.stats()
             }
         )
     except Exception as e:
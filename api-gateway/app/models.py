@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index, desc, text, Enum as SQLEnum
 from datetime import datetime
 from enum import Enum
 from sqlalchemy.dialects.postgresql import UUID
@@ -12,6 +12,10 @@ class NotificationStatus(str, Enum):
 
 class NotificationRequest(Base):
     __tablename__ = "notification_requests"
+    __table_args__ = (
+        # Serves a user's history newest-first, including keyset page seeks
+        Index("ix_notification_requests_user_created_id", "user_id", desc("created_at"), desc("id")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     request_id = Column(String, unique=True, index=True, nullable=False)  # For idempotency
@@ -29,6 +33,102 @@ class NotificationRequest(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     sent_at = Column(DateTime, nullable=True)
+    status_updated_at = Column(DateTime, nullable=True)  # Timestamp of the last applied status event
 
     def __repr__(self):
         return f"<NotificationRequest(id={self.id}, request_id={self.request_id}, status={self.status})>"
+
+class OutboxMessage(Base):
+    """Queue message written in the same transaction as its notification.
+
+    Rows are drained and published by the outbox relay, then deleted.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True)
+    notification_id = Column(Integer, nullable=False, index=True)
+    exchange = Column(String, nullable=False)
+    routing_key = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    correlation_id = Column(String, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, notification_id={self.notification_id}, routing_key={self.routing_key})>"
+
+class BulkJobStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+class BulkJob(Base):
+    """A bulk send processed in chunks in the background.
+
+    Counters are advanced in the same transaction as each chunk's
+    notifications, so they stay exact across restarts.
+    """
+    __tablename__ = "bulk_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    correlation_id = Column(String, index=True, nullable=False)
+    notification_type = Column(String, nullable=False)
+    template_code = Column(String, nullable=False)
+    variables = Column(JSON, default=dict, nullable=False)
+    priority = Column(Integer, default=0, nullable=False)
+    status = Column(SQLEnum(BulkJobStatus), default=BulkJobStatus.pending, nullable=False, index=True)
+    total = Column(Integer, default=0, nullable=False)
+    queued = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    last_recipient_id = Column(Integer, default=0, nullable=False)  # Cursor into bulk_job_recipients
+    error_message = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+    @property
+    def pending(self) -> int:
+        return max(self.total - self.queued - self.failed, 0)
+
+    def __repr__(self):
+        return f"<BulkJob(id={self.id}, status={self.status}, queued={self.queued}, failed={self.failed}, total={self.total})>"
+
+class BulkJobRecipient(Base):
+    """One recipient of a bulk job, processed in id order"""
+    __tablename__ = "bulk_job_recipients"
+    __table_args__ = (Index("ix_bulk_job_recipients_job_id_id", "job_id", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String, nullable=False)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    error_message = Column(String, nullable=True)  # Why the recipient could not be queued
+
+# Columns and indexes added after their tables first shipped; create_all
+# only creates missing tables, so existing databases get them from here
+SCHEMA_UPGRADES = [
+    "ALTER TABLE notification_requests ADD COLUMN IF NOT EXISTS status_updated_at TIMESTAMP WITHOUT TIME ZONE",
+    "ALTER TABLE bulk_job_recipients ADD COLUMN IF NOT EXISTS error_message VARCHAR",
+]
+
+CONCURRENT_INDEXES = {
+    "ix_notification_requests_user_created_id":
+        "notification_requests (user_id, created_at DESC, id DESC)",
+}
+
+def upgrade_schema(bind):
+    """Apply SCHEMA_UPGRADES and build missing CONCURRENT_INDEXES without locking out writes"""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
+        for name, definition in CONCURRENT_INDEXES.items():
+            # An interrupted concurrent build leaves an invalid index that IF NOT EXISTS would keep
+            invalid = conn.execute(text(
+                "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+                "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+            ), {"name": name}).first()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}"))
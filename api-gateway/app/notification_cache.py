@@ -0,0 +1,94 @@
+"""Read-through cache of serialized notification responses"""
+import json
+from typing import Iterable, NamedTuple, Optional
+
+from . import schemas, config
+from .cache_manager import get_cache_manager
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("notification-cache")
+
+cache_mgr = get_cache_manager(config.REDIS_URL)
+
+# Writes a response only if the notification was not invalidated since the
+# reader took its version, so a slow reader cannot cache a superseded row
+FILL_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[2]) or '0') ~= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[4])
+redis.call('SET', KEYS[3], ARGV[3], 'EX', ARGV[4])
+return 1
+"""
+
+fill_script = None
+
+class CachedNotification(NamedTuple):
+    """A cached response, or None, and the version to fill the cache under on a miss"""
+    response: Optional[schemas.NotificationResponse]
+    version: int
+
+def notification_cache_key(notification_id: int) -> str:
+    return f"notification:{notification_id}"
+
+def notification_version_key(notification_id: int) -> str:
+    # Bumped on every invalidation; outlives any read that could race it
+    return f"notification_version:{notification_id}"
+
+def request_id_cache_key(request_id: str) -> str:
+    # request_id -> id never changes, so this pointer is never invalidated
+    return f"notification_request:{request_id}"
+
+async def get_cached_notification(notification_id: int) -> CachedNotification:
+    """Return the cached response for a notification id, if any, with its version.
+
+    On a miss, pass the version to cache_notification after loading the
+    row, so the fill is dropped if the notification changed meanwhile.
+    """
+    payload, version = await cache_mgr.get_many([
+        notification_cache_key(notification_id),
+        notification_version_key(notification_id)
+    ])
+    return CachedNotification(schemas.NotificationResponse(**payload) if payload else None, int(version or 0))
+
+async def get_cached_notification_id(request_id: str) -> Optional[int]:
+    """Return the notification id cached for a request id, if any"""
+    return await cache_mgr.get(request_id_cache_key(request_id))
+
+async def cache_notification(response: schemas.NotificationResponse, version: int):
+    """Store a response under its id, plus the request_id pointer to it, unless invalidated since `version`"""
+    global fill_script
+    try:
+        await cache_mgr.connect()
+        if fill_script is None:
+            fill_script = cache_mgr.client.register_script(FILL_SCRIPT)
+        await fill_script(
+            keys=[
+                notification_cache_key(response.id),
+                notification_version_key(response.id),
+                request_id_cache_key(response.request_id)
+            ],
+            args=[version, json.dumps(response.model_dump(mode="json")), response.id, config.NOTIFICATION_CACHE_TTL]
+        )
+    except Exception as e:
+        logger.error(f"Error caching notification: {str(e)}")
+
+async def invalidate_notifications(notification_ids: Iterable[int]):
+    """Drop cached responses after their status changed.
+
+    Call this after the change is committed. Bumping the version makes
+    any read that loaded the old row skip its cache fill.
+    """
+    notification_ids = list(notification_ids)
+    if not notification_ids:
+        return
+    try:
+        await cache_mgr.connect()
+        async with cache_mgr.client.pipeline(transaction=False) as pipe:
+            for notification_id in notification_ids:
+                pipe.incr(notification_version_key(notification_id))
+                pipe.expire(notification_version_key(notification_id), config.NOTIFICATION_CACHE_TTL)
+                pipe.delete(notification_cache_key(notification_id))
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Error invalidating cached notifications: {str(e)}")
@@ -0,0 +1,147 @@
+"""Background relay that publishes the transactional outbox to RabbitMQ"""
+import asyncio
+from datetime import datetime
+from sqlalchemy import select, delete, update
+
+from . import models, config
+from .database import AsyncSessionLocal
+from .queue_manager import QueueManager, OutgoingMessage
+from .status_events import announce_status_changes
+from .status_updates import AppliedStatus
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("outbox-relay")
+
+class OutboxRelay:
+    """Drains notification_outbox in batches and publishes with confirms"""
+
+    def __init__(
+        self,
+        queue_manager: QueueManager,
+        batch_size: int = 500,
+        poll_interval: float = 0.5,
+        max_attempts: int = 10
+    ):
+        self.queue_manager = queue_manager
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._stopping = asyncio.Event()
+        self._task = None
+        self._consecutive_failures = 0
+
+    def start(self):
+        """Start the relay loop as a background task"""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Outbox relay started (batch size {self.batch_size})")
+
+    async def stop(self):
+        """Stop the relay loop after the current batch"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+            logger.info("Outbox relay stopped")
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                relayed = await self.relay_batch()
+            except Exception as e:
+                logger.error(f"Error relaying outbox batch: {str(e)}")
+                self._consecutive_failures += 1
+                relayed = 0
+
+            # A full batch means there is probably more waiting, so go again;
+            # back off exponentially while the broker keeps rejecting publishes
+            if relayed < self.batch_size:
+                delay = min(self.poll_interval * (2 ** self._consecutive_failures), 30.0)
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def relay_batch(self) -> int:
+        """Publish one batch of outbox rows, returns number of rows published"""
+        abandoned = {}
+        async with AsyncSessionLocal() as db:
+            async with db.begin():
+                # SKIP LOCKED lets several gateway replicas drain the outbox in parallel
+                rows = (await db.execute(
+                    select(models.OutboxMessage)
+                    .order_by(models.OutboxMessage.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )).scalars().all()
+                if not rows:
+                    self._consecutive_failures = 0
+                    return 0
+
+                try:
+                    errors = await self.queue_manager.publish_many([
+                        OutgoingMessage(row.exchange, row.routing_key, row.payload, row.correlation_id)
+                        for row in rows
+                    ])
+                except Exception as e:
+                    # Nothing was confirmed (broker down or circuit open): count
+                    # one attempt against the head of the batch and retry later
+                    await self._record_failure(db, rows[0], str(e), abandoned)
+                    errors = [e] * len(rows)
+                else:
+                    for row, error in zip(rows, errors):
+                        if error is not None:
+                            logger.warning(f"Failed to publish outbox message {row.id}: {str(error)}")
+                            await self._record_failure(db, row, str(error), abandoned)
+
+                published_ids = [row.id for row, error in zip(rows, errors) if error is None]
+                if published_ids:
+                    await db.execute(
+                        delete(models.OutboxMessage).where(models.OutboxMessage.id.in_(published_ids))
+                    )
+
+        await announce_status_changes(abandoned)
+
+        if len(published_ids) < len(rows):
+            self._consecutive_failures += 1
+        else:
+            self._consecutive_failures = 0
+        return len(published_ids)
+
+    async def _record_failure(self, db, row: models.OutboxMessage, error: str, abandoned: dict):
+        row.attempts += 1
+        row.last_error = error
+        if row.attempts < self.max_attempts:
+            return
+
+        # Give up: surface the failure on the notification like a direct publish would
+        logger.error(f"Giving up on outbox message {row.id} after {row.attempts} attempts: {error}")
+        now = datetime.utcnow()
+        await db.execute(
+            update(models.NotificationRequest)
+            .where(models.NotificationRequest.id == row.notification_id)
+            .values(
+                status=models.NotificationStatus.failed,
+                error_message=error,
+                status_updated_at=now,
+                updated_at=now
+            )
+        )
+        await db.delete(row)
+        abandoned[row.notification_id] = AppliedStatus(row.payload["user_id"], models.NotificationStatus.failed, error, now)
+
+# Global outbox relay instance
+outbox_relay = None
+
+def get_outbox_relay(queue_manager: QueueManager) -> OutboxRelay:
+    """Get or create outbox relay instance"""
+    global outbox_relay
+    if outbox_relay is None:
+        outbox_relay = OutboxRelay(
+            queue_manager,
+            batch_size=config.OUTBOX_BATCH_SIZE,
+            poll_interval=config.OUTBOX_POLL_INTERVAL,
+            max_attempts=config.OUTBOX_MAX_ATTEMPTS
+        )
+    return outbox_relay
@@ -0,0 +1,107 @@
+"""ETag caching of upstream proxy reads"""
+import hashlib
+import json
+import time
+from fastapi import Response
+from typing import Any, Dict, Iterable, Optional
+
+from . import config
+from .cache_manager import get_cache_manager
+from .http_client import get_http_client
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("proxy-cache")
+
+cache_mgr = get_cache_manager(config.REDIS_URL)
+
+def proxy_cache_key(upstream: str, path: str) -> str:
+    return f"proxy_cache:{upstream}:{path}"
+
+def proxy_tag_key(tag: str) -> str:
+    return f"proxy_cache_tag:{tag}"
+
+def compute_etag(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+def cached_response(entry: Dict[str, Any], if_none_match: Optional[str]) -> Response:
+    """Answer from a cache entry, with 304 if the client already has it"""
+    headers = {"ETag": entry["etag"], "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=entry["body"],
+        status_code=entry["status"],
+        media_type=entry["content_type"],
+        headers=headers
+    )
+
+async def cached_proxy_get(
+    upstream: str,
+    path: str,
+    tags: Iterable[str],
+    if_none_match: Optional[str] = None
+) -> Response:
+    """Serve an upstream GET from the cache, revalidating it when it gets old.
+
+    Entries younger than PROXY_CACHE_FRESH_SECONDS are served without
+    contacting the upstream; older ones are revalidated with
+    If-None-Match when the upstream gave an ETag. Write routes drop
+    entries by tag. Raises httpx.HTTPError like proxy_request.
+    """
+    key = proxy_cache_key(upstream, path)
+    entry = await cache_mgr.get(key)
+    if entry and time.time() - entry["checked_at"] < config.PROXY_CACHE_FRESH_SECONDS:
+        return cached_response(entry, if_none_match)
+
+    headers = {}
+    if entry and entry.get("upstream_etag"):
+        headers["If-None-Match"] = entry["upstream_etag"]
+    response = await get_http_client(upstream).send("GET", path, headers=headers)
+
+    if response.status_code == 304 and entry:
+        entry["checked_at"] = time.time()
+    else:
+        response.raise_for_status()
+        entry = {
+            "body": response.text,
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "etag": compute_etag(response.content),
+            "upstream_etag": response.headers.get("etag"),
+            "checked_at": time.time()
+        }
+    await _store(key, entry, tags)
+    return cached_response(entry, if_none_match)
+
+async def _store(key: str, entry: Dict[str, Any], tags: Iterable[str]):
+    try:
+        await cache_mgr.connect()
+        async with cache_mgr.client.pipeline(transaction=False) as pipe:
+            pipe.set(key, json.dumps(entry), ex=config.PROXY_CACHE_TTL)
+            for tag in tags:
+                pipe.sadd(proxy_tag_key(tag), key)
+                pipe.expire(proxy_tag_key(tag), config.PROXY_CACHE_TTL)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Error caching proxy response: {str(e)}")
+
+async def invalidate_proxy_cache(*tags: str):
+    """Drop every cached response carrying one of the tags"""
+    try:
+        await cache_mgr.connect()
+        tag_keys = [proxy_tag_key(tag) for tag in tags]
+        async with cache_mgr.client.pipeline(transaction=False) as pipe:
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = await pipe.execute()
+        keys = set().union(*members)
+        await cache_mgr.client.delete(*keys, *tag_keys)
+    except Exception as e:
+        logger.error(f"Error invalidating proxy cache: {str(e)}")
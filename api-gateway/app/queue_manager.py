@@ -1,151 +1,281 @@
 """RabbitMQ queue manager with circuit breaker"""
-import pika
+import aio_pika
+import asyncio
 import json
-import time
-from typing import Dict, Any
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, NamedTuple, Optional
+from pamqp.commands import Basic
 
+from . import config
 from .utils.logging_config import setup_logging
 from .utils.circuit_breaker import CircuitBreaker
 
 logger = setup_logging("queue-manager")
 
+# Queue and routing key suffixes for notification priorities above normal;
+# priority 0 keeps the plain queue (e.g. email.queue, routing key 'email')
+PRIORITY_SUFFIXES = {1: "high", 2: "urgent"}
+
+def priority_routing_key(notification_type: str, priority: int) -> str:
+    """Routing key for a notification type at a priority, e.g. 'email.urgent'"""
+    suffix = PRIORITY_SUFFIXES.get(priority)
+    return f"{notification_type}.{suffix}" if suffix else notification_type
+
+def priority_queue_name(queue: str, priority: int) -> str:
+    """Queue for a base queue at a priority, e.g. 'email.queue.urgent'"""
+    suffix = PRIORITY_SUFFIXES.get(priority)
+    return f"{queue}.{suffix}" if suffix else queue
+
+class OutgoingMessage(NamedTuple):
+    """A message to publish with QueueManager.publish_many"""
+    exchange: str
+    routing_key: str
+    message: Dict[str, Any]
+    correlation_id: Optional[str] = None
+
+def _build_message(message: Dict[str, Any], correlation_id: Optional[str]) -> aio_pika.Message:
+    return aio_pika.Message(
+        body=json.dumps(message).encode(),
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,  # Make message persistent
+        content_type='application/json',
+        correlation_id=correlation_id
+    )
+
+class PooledChannel:
+    """A publisher channel plus the health stats the pool routes on"""
+
+    def __init__(self, channel: aio_pika.abc.AbstractChannel):
+        self.channel = channel
+        self.in_flight = 0
+        self.consecutive_failures = 0
+
+class ChannelPool:
+    """Bounded set of confirm-mode channels shared by concurrent publishers.
+
+    Each publish goes to the healthy channel with the fewest unconfirmed
+    messages, so concurrent publishes proceed in parallel on separate
+    channels. Channels that close or keep failing are discarded and
+    reopened lazily on the (robust) connection instead of reconnecting it.
+    """
+
+    def __init__(self, size: int = 8, max_failures: int = 3):
+        self.size = size
+        self.max_failures = max_failures
+        self.slots: List[Optional[PooledChannel]] = [None] * size
+        self._open_lock = asyncio.Lock()
+
+    def _is_healthy(self, slot: Optional[PooledChannel]) -> bool:
+        return (
+            slot is not None
+            and not slot.channel.is_closed
+            and slot.consecutive_failures < self.max_failures
+        )
+
+    async def _replace_unhealthy(self, connection: aio_pika.abc.AbstractConnection):
+        async with self._open_lock:
+            for index, slot in enumerate(self.slots):
+                if self._is_healthy(slot):
+                    continue
+                if slot is not None:
+                    logger.warning(f"Replacing unhealthy publisher channel {index} ({slot.consecutive_failures} consecutive failures)")
+                    if not slot.channel.is_closed:
+                        await slot.channel.close()
+                self.slots[index] = PooledChannel(await connection.channel(publisher_confirms=True))
+
+    @asynccontextmanager
+    async def acquire(self, connection: aio_pika.abc.AbstractConnection):
+        """Yield the least-loaded healthy channel, tracking the publish outcome"""
+        if not all(self._is_healthy(slot) for slot in self.slots):
+            await self._replace_unhealthy(connection)
+
+        slot = min(self.slots, key=lambda candidate: candidate.in_flight)
+        slot.in_flight += 1
+        try:
+            yield slot.channel
+            slot.consecutive_failures = 0
+        except Exception:
+            slot.consecutive_failures += 1
+            raise
+        finally:
+            slot.in_flight -= 1
+
+    async def close(self):
+        for slot in self.slots:
+            if slot is not None and not slot.channel.is_closed:
+                await slot.channel.close()
+        self.slots = [None] * self.size
+
 class QueueManager:
     """Manages RabbitMQ connections and message publishing"""
-    
-    def __init__(self, rabbitmq_url: str):
+
+    def __init__(self, rabbitmq_url: str, channel_pool_size: int = 8):
         self.rabbitmq_url = rabbitmq_url
         self.connection = None
         self.channel = None
+        self.channel_pool = ChannelPool(size=channel_pool_size)
+        self._connect_lock = asyncio.Lock()
         self.circuit_breaker = CircuitBreaker(
             failure_threshold=5,
             recovery_timeout=60,
             expected_exception=Exception
         )
-    
-    def connect(self, max_retries=5, retry_delay=2):
+
+    async def connect(self, max_retries=5, retry_delay=2):
         """Establish connection to RabbitMQ with retry logic"""
-        for attempt in range(max_retries):
-            try:
-                if self.connection and not self.connection.is_closed:
+        async with self._connect_lock:
+            for attempt in range(max_retries):
+                try:
+                    if self.connection and not self.connection.is_closed:
+                        if self.channel is None or self.channel.is_closed:
+                            self.channel = await self.connection.channel(publisher_confirms=True)
+                        return
+
+                    # Robust connections re-establish themselves (and their channels)
+                    # after broker restarts without us having to reconnect per publish
+                    self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
+                    self.channel = await self.connection.channel(publisher_confirms=True)
+
+                    logger.info("Connected to RabbitMQ")
                     return
-                
-                parameters = pika.URLParameters(self.rabbitmq_url)
-                self.connection = pika.BlockingConnection(parameters)
-                self.channel = self.connection.channel()
-                
-                logger.info("Connected to RabbitMQ")
-                return
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    logger.warning(f"Failed to connect to RabbitMQ (attempt {attempt + 1}/{max_retries}): {str(e)}. Retrying in {retry_delay}s...")
-                    time.sleep(retry_delay)
-                else:
-                    logger.error(f"Failed to connect to RabbitMQ after {max_retries} attempts: {str(e)}")
-                    raise
-    
-    def setup_queues(self, exchange_name: str, email_queue: str, push_queue: str, failed_queue: str):
+                except Exception as e:
+                    if attempt < max_retries - 1:
+                        logger.warning(f"Failed to connect to RabbitMQ (attempt {attempt + 1}/{max_retries}): {str(e)}. Retrying in {retry_delay}s...")
+                        await asyncio.sleep(retry_delay)
+                    else:
+                        logger.error(f"Failed to connect to RabbitMQ after {max_retries} attempts: {str(e)}")
+                        raise
+
+    async def setup_queues(
+        self,
+        exchange_name: str,
+        email_queue: str,
+        push_queue: str,
+        failed_queue: str,
+        status_queue: Optional[str] = None
+    ):
         """Setup exchange and queues"""
         try:
-            self.connect()
-            
+            await self.connect()
+
             # Declare exchange
-            self.channel.exchange_declare(
-                exchange=exchange_name,
-                exchange_type='direct',
+            exchange = await self.channel.declare_exchange(
+                exchange_name,
+                aio_pika.ExchangeType.DIRECT,
                 durable=True
             )
-            
-            # Declare email queue
-            self.channel.queue_declare(
-                queue=email_queue,
-                durable=True,
-                arguments={
-                    'x-dead-letter-exchange': exchange_name,
-                    'x-dead-letter-routing-key': 'failed'
-                }
-            )
-            self.channel.queue_bind(
-                exchange=exchange_name,
-                queue=email_queue,
-                routing_key='email'
-            )
-            
-            # Declare push queue
-            self.channel.queue_declare(
-                queue=push_queue,
-                durable=True,
-                arguments={
-                    'x-dead-letter-exchange': exchange_name,
-                    'x-dead-letter-routing-key': 'failed'
-                }
-            )
-            self.channel.queue_bind(
-                exchange=exchange_name,
-                queue=push_queue,
-                routing_key='push'
-            )
-            
+
+            # Declare email and push queues, one per priority so urgent
+            # messages never wait behind a backlog of normal ones
+            for base_queue, notification_type in ((email_queue, 'email'), (push_queue, 'push')):
+                for priority in (0, *PRIORITY_SUFFIXES):
+                    queue = await self.channel.declare_queue(
+                        priority_queue_name(base_queue, priority),
+                        durable=True,
+                        arguments={
+                            'x-dead-letter-exchange': exchange_name,
+                            'x-dead-letter-routing-key': 'failed'
+                        }
+                    )
+                    await queue.bind(exchange, routing_key=priority_routing_key(notification_type, priority))
+
             # Declare failed queue (dead letter queue)
-            self.channel.queue_declare(
-                queue=failed_queue,
+            queue = await self.channel.declare_queue(
+                failed_queue,
                 durable=True
             )
-            self.channel.queue_bind(
-                exchange=exchange_name,
-                queue=failed_queue,
-                routing_key='failed'
-            )
-            
-            logger.info(f"Queues setup completed: {email_queue}, {push_queue}, {failed_queue}")
+            await queue.bind(exchange, routing_key='failed')
+
+            # Declare status queue (delivery status events from the workers)
+            if status_queue:
+                queue = await self.channel.declare_queue(
+                    status_queue,
+                    durable=True
+                )
+                await queue.bind(exchange, routing_key='status')
+
+            logger.info(f"Queues setup completed: {email_queue}, {push_queue}, {failed_queue}, {status_queue}")
         except Exception as e:
             logger.error(f"Failed to setup queues: {str(e)}")
             raise
-    
-    def publish_message(
+
+    async def publish_many(
         self,
-        exchange: str,
-        routing_key: str,
-        message: Dict[str, Any],
-        correlation_id: str = None
-    ):
-        """Publish message to queue with circuit breaker"""
-        def _publish():
-            # Only reconnect if connection is actually closed
+        messages: List[OutgoingMessage],
+        max_in_flight: int = 1000
+    ) -> List[Optional[Exception]]:
+        """Publish a batch with pipelined publisher confirms.
+
+        Up to max_in_flight publishes are outstanding at once instead of one
+        round-trip per message. The channel tracks delivery tags and resolves
+        each confirmation on ack/nack, including multiple=True acks. Returns
+        one entry per message: None when the broker acked it, otherwise the
+        exception it failed with.
+        """
+        async def _publish_many():
             if not self.connection or self.connection.is_closed:
                 logger.info("Connection closed, reconnecting...")
-                self.connect()
-            elif not self.channel or not self.channel.is_open:
-                logger.info("Channel closed, reconnecting...")
-                self.connect()
-            
-            properties = pika.BasicProperties(
-                delivery_mode=2,  # Make message persistent
-                content_type='application/json',
-                correlation_id=correlation_id
-            )
-            
-            self.channel.basic_publish(
-                exchange=exchange,
-                routing_key=routing_key,
-                body=json.dumps(message),
-                properties=properties
+                await self.connect()
+
+            window = asyncio.Semaphore(max_in_flight)
+
+            async def _publish_one(outgoing: OutgoingMessage):
+                async with window:
+                    async with self.channel_pool.acquire(self.connection) as channel:
+                        await self._publish_confirmed(
+                            channel,
+                            outgoing.exchange,
+                            outgoing.routing_key,
+                            outgoing.message,
+                            outgoing.correlation_id
+                        )
+
+            results = await asyncio.gather(
+                *(_publish_one(outgoing) for outgoing in messages),
+                return_exceptions=True
             )
-            
-            logger.info(f"Message published to {routing_key}: {correlation_id}")
-        
+            errors = [result if isinstance(result, BaseException) else None for result in results]
+
+            # Only a batch that failed entirely counts against the circuit breaker
+            if errors and all(errors):
+                raise errors[0]
+            return errors
+
+        if not messages:
+            return []
         try:
-            self.circuit_breaker.call(_publish)
+            errors = await self.circuit_breaker.call_async(_publish_many)
         except Exception as e:
-            logger.error(f"Failed to publish message: {str(e)}")
+            logger.error(f"Failed to publish batch of {len(messages)} messages: {str(e)}")
             raise
-    
-    def close(self):
+
+        failed = sum(1 for error in errors if error is not None)
+        logger.info(f"Published batch: {len(messages) - failed} confirmed, {failed} failed")
+        return errors
+
+    async def _publish_confirmed(
+        self,
+        channel: aio_pika.abc.AbstractChannel,
+        exchange: str,
+        routing_key: str,
+        message: Dict[str, Any],
+        correlation_id: Optional[str]
+    ):
+        target = await channel.get_exchange(exchange, ensure=False)
+        confirmation = await target.publish(
+            _build_message(message, correlation_id),
+            routing_key=routing_key
+        )
+        if not isinstance(confirmation, Basic.Ack):
+            raise Exception(f"Broker did not acknowledge message: {confirmation}")
+
+    async def close(self):
         """Close RabbitMQ connection"""
         try:
-            if self.channel and self.channel.is_open:
-                self.channel.close()
+            await self.channel_pool.close()
+            if self.channel and not self.channel.is_closed:
+                await self.channel.close()
             if self.connection and not self.connection.is_closed:
-                self.connection.close()
+                await self.connection.close()
             logger.info("RabbitMQ connection closed")
         except Exception as e:
             logger.error(f"Error closing connection: {str(e)}")
@@ -157,5 +287,5 @@ def get_queue_manager(rabbitmq_url: str) -> QueueManager:
     """Get or create queue manager instance"""
     global queue_manager
     if queue_manager is None:
-        queue_manager = QueueManager(rabbitmq_url)
+        queue_manager = QueueManager(rabbitmq_url, channel_pool_size=config.RABBITMQ_CHANNEL_POOL_SIZE)
     return queue_manager
@@ -0,0 +1,209 @@
+"""GCRA rate limiting in Redis with in-process token leases"""
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from . import config
+from .cache_manager import GCRA_LUA, get_cache_manager
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("rate-limiter")
+
+# Expired leases are swept once this many keys are held in process
+MAX_LOCAL_ENTRIES = 10000
+
+# The GCRA on its own, for checks made outside the send preflight
+GCRA_SCRIPT = GCRA_LUA + """
+return gcra(1, 1)
+"""
+
+class RateLimitPolicy(NamedTuple):
+    """`limit` requests per `period` seconds, allowing bursts of up to `burst`"""
+    limit: int
+    period: float
+    burst: int
+
+    @property
+    def interval_ms(self) -> float:
+        return self.period * 1000 / self.limit
+
+def parse_policy(spec: str) -> Optional[RateLimitPolicy]:
+    """Parse "limit/period" or "limit/period/burst"; an empty spec disables the policy"""
+    if not spec:
+        return None
+    parts = [part.strip() for part in spec.split("/")]
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid rate limit policy: {spec}")
+    limit, period = int(parts[0]), float(parts[1])
+    burst = int(parts[2]) if len(parts) == 3 else limit
+    return RateLimitPolicy(limit, period, burst)
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    retry_after: float = 0.0
+    scope: Optional[str] = None
+
+class RateLimitPlan(NamedTuple):
+    """The buckets a request is checked against, those needing Redis and the leased tokens it holds"""
+    buckets: List[Tuple[str, str, RateLimitPolicy]]
+    needed: List[Tuple[str, str, RateLimitPolicy]]
+    reserved: List[Tuple[str, float]]
+    now: float
+
+class RateLimiter:
+    """Checks requests against every policy that applies to them.
+
+    Tokens are taken from Redis in leases sized to what the policy
+    refills in `lease_seconds`, then spent in process, so busy API keys
+    and templates cost a Redis call per lease rather than per request.
+    Leased tokens are taken when the check is planned, before any await,
+    and handed back if another policy denies the request. Low-rate
+    policies (like the per-user one) get leases of one token and are
+    checked in Redis every time; on the send path that check runs inside
+    the preflight script (plan/complete), so it costs no extra round-trip.
+    If Redis is unreachable each process falls back to enforcing the
+    policies on its own.
+    """
+
+    def __init__(
+        self,
+        policies: Dict[str, Optional[RateLimitPolicy]],
+        overrides: Optional[Dict[str, Optional[RateLimitPolicy]]] = None,
+        lease_seconds: float = 1.0
+    ):
+        self.cache_mgr = get_cache_manager(config.REDIS_URL)
+        self.policies = policies
+        self.overrides = overrides or {}
+        self.lease_seconds = lease_seconds
+        self.script = None
+        self._leases: Dict[str, Tuple[int, float]] = {}
+        self._fallback_tats: Dict[str, float] = {}
+
+    def policy_for(self, scope: str, identifier: str) -> Optional[RateLimitPolicy]:
+        """Per-identifier override if configured, otherwise the scope's default"""
+        return self.overrides.get(f"{scope}:{identifier}", self.policies.get(scope))
+
+    def lease_size(self, policy: RateLimitPolicy) -> int:
+        return max(1, min(policy.burst, int(policy.limit / policy.period * self.lease_seconds)))
+
+    def plan(self, subjects: List[Tuple[str, str]]) -> RateLimitPlan:
+        """Take a leased token for each (scope, identifier) bucket that has one; the rest need Redis"""
+        buckets = []
+        for scope, identifier in subjects:
+            policy = self.policy_for(scope, str(identifier))
+            if policy is not None:
+                buckets.append((scope, f"rate_limit:gcra:{scope}:{identifier}", policy))
+
+        now = time.monotonic()
+        needed, reserved = [], []
+        for bucket in buckets:
+            tokens, expires_at = self._leases.get(bucket[1], (0, now))
+            if tokens >= 1 and expires_at >= now:
+                self._leases[bucket[1]] = (tokens - 1, expires_at)
+                reserved.append((bucket[1], expires_at))
+            else:
+                needed.append(bucket)
+        return RateLimitPlan(buckets, needed, reserved, now)
+
+    def script_inputs(self, plan: RateLimitPlan) -> Tuple[List[str], List[Any]]:
+        """Keys and arguments for the GCRA over the buckets that need Redis"""
+        args = []
+        for _, _, policy in plan.needed:
+            args.extend([policy.interval_ms, policy.burst, self.lease_size(policy)])
+        return [key for _, key, _ in plan.needed], args
+
+    def complete(self, plan: RateLimitPlan, reply: Optional[List[int]]) -> RateLimitResult:
+        """Finish a check whose GCRA ran inside another script (the send preflight).
+
+        A missing reply means Redis was not reached, so the policies are
+        enforced locally as in check().
+        """
+        if plan.needed:
+            if reply is None:
+                result = self._acquire_locally(plan.needed, plan.now)
+            else:
+                result = self._apply_reply(plan.needed, reply, plan.now)
+            if not result.allowed:
+                self.release(plan)
+                return result
+        return self._admit(plan)
+
+    def release(self, plan: RateLimitPlan):
+        """Hand back the leased tokens a plan took, for a request that was not charged"""
+        for key, expires_at in plan.reserved:
+            tokens, current_expiry = self._leases.get(key, (0, expires_at))
+            self._leases[key] = (tokens + 1, max(current_expiry, expires_at))
+
+    async def check(self, subjects: List[Tuple[str, str]]) -> RateLimitResult:
+        """Take one token for each (scope, identifier), or none if any is exhausted"""
+        plan = self.plan(subjects)
+        if plan.needed:
+            result = await self._acquire(plan.needed, plan.now)
+            if not result.allowed:
+                self.release(plan)
+                return result
+        return self._admit(plan)
+
+    def _admit(self, plan: RateLimitPlan) -> RateLimitResult:
+        if len(self._leases) > MAX_LOCAL_ENTRIES or len(self._fallback_tats) > MAX_LOCAL_ENTRIES:
+            self._prune(plan.now)
+        return RateLimitResult(True)
+
+    def _prune(self, now: float):
+        self._leases = {key: lease for key, lease in self._leases.items() if lease[1] >= now}
+        self._fallback_tats = {key: tat for key, tat in self._fallback_tats.items() if tat > now}
+
+    async def _acquire(self, buckets, now: float) -> RateLimitResult:
+        try:
+            await self.cache_mgr.connect()
+            if self.script is None:
+                self.script = self.cache_mgr.client.register_script(GCRA_SCRIPT)
+            args = []
+            for _, _, policy in buckets:
+                args.extend([policy.interval_ms, policy.burst, self.lease_size(policy)])
+            reply = await self.script(keys=[key for _, key, _ in buckets], args=args)
+        except Exception as e:
+            logger.error(f"Error checking rate limit in Redis, enforcing locally: {str(e)}")
+            return self._acquire_locally(buckets, now)
+        return self._apply_reply(buckets, reply, now)
+
+    def _apply_reply(self, buckets, reply: List[int], now: float) -> RateLimitResult:
+        """Turn a GCRA reply into leases, or a denial naming the exhausted scope"""
+        if int(reply[0]) == 0:
+            return RateLimitResult(False, int(reply[1]) / 1000, buckets[int(reply[2]) - 1][0])
+        for (_, key, _), granted in zip(buckets, reply[1:]):
+            # One granted token is this request's; the rest join whatever a concurrent refill left
+            tokens, expires_at = self._leases.get(key, (0, now))
+            left = tokens if expires_at >= now else 0
+            self._leases[key] = (left + int(granted) - 1, now + self.lease_seconds)
+        return RateLimitResult(True)
+
+    def _acquire_locally(self, buckets, now: float) -> RateLimitResult:
+        """The same GCRA in process memory, one token at a time"""
+        new_tats = []
+        for scope, key, policy in buckets:
+            interval = policy.interval_ms / 1000
+            tat = max(self._fallback_tats.get(key, now), now)
+            if tat - now > (policy.burst - 1) * interval:
+                return RateLimitResult(False, tat - now - (policy.burst - 1) * interval, scope)
+            new_tats.append((key, tat + interval))
+        for key, tat in new_tats:
+            self._fallback_tats[key] = tat
+        return RateLimitResult(True)
+
+# Global rate limiter instance
+rate_limiter = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create rate limiter instance with the configured policies"""
+    global rate_limiter
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(
+            policies={
+                "user": parse_policy(config.RATE_LIMIT_USER),
+                "template": parse_policy(config.RATE_LIMIT_TEMPLATE),
+                "api_key": parse_policy(config.RATE_LIMIT_API_KEY)
+            },
+            overrides={key: parse_policy(spec) for key, spec in config.RATE_LIMIT_OVERRIDES.items()},
+            lease_seconds=config.RATE_LIMIT_LEASE_SECONDS
+        )
+    return rate_limiter
@@ -1,16 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import Optional, List, Dict, Any
+import asyncio
+import math
 import uuid
 from uuid import UUID
-from datetime import datetime
 from . import models, schemas, config
-from .database import get_db
-from .queue_manager import get_queue_manager
+from .database import get_async_db, AsyncSessionLocal
 from .cache_manager import get_cache_manager
-from .utils.logging_config import setup_logging, get_correlation_id
-import requests
+from .user_lookup import load_user, user_cache_key, local_users, remember_user, invalidate_user, user_flights
+from .http_client import proxy_request
+from .proxy_cache import cached_proxy_get, invalidate_proxy_cache
+from .rate_limiter import get_rate_limiter
+from .dispatch import recipient_for, notification_row, outbox_entry
+from .bulk_jobs import create_bulk_job, get_bulk_job_runner, load_bulk_job_failures
+from .ingest import ingest_ndjson
+from .status_store import save_status_updates, load_notification_response
+from .status_events import (
+    announce_status_changes, get_status_event_hub,
+    notification_channel, user_channel, format_sse
+)
+from .notification_cache import get_cached_notification, get_cached_notification_id, cache_notification
+from .utils.logging_config import setup_logging
+from .utils.pagination import encode_cursor, decode_cursor
+import httpx
 
 logger = setup_logging("api-gateway")
 
@@ -19,10 +35,9 @@ user_router = APIRouter()
 template_router = APIRouter()
 
 # Initialize managers
-queue_mgr = get_queue_manager(config.RABBITMQ_URL)
 cache_mgr = get_cache_manager(config.REDIS_URL)
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class SimpleNotificationRequest(BaseModel):
     user_id: UUID = Field(..., alias="id") # Accept 'id' from client, map to 'user_id' internally
@@ -30,10 +45,12 @@ class SimpleNotificationRequest(BaseModel):
     variables: Dict[str, Any]
     priority: str = "normal"
 
+
 @router.post("/email", response_model=schemas.APIResponse[schemas.NotificationResponse], status_code=status.HTTP_201_CREATED)
-def send_email_notification(
+async def send_email_notification(
     request: SimpleNotificationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    x_api_key: Optional[str] = Header(None, alias="X-API-Key")
 ):
     """Convenience endpoint to send email notifications"""
     # Map priority string to int
@@ -51,13 +68,14 @@ def send_email_notification(
     )
     
     # Use the existing send_notification function, generate correlation_id here
-    return send_notification(notification, db, correlation_id=str(uuid.uuid4()))
+    return await send_notification(notification, db, correlation_id=str(uuid.uuid4()), x_api_key=x_api_key)
 
 
 @router.post("/push", response_model=schemas.APIResponse[schemas.NotificationResponse], status_code=status.HTTP_201_CREATED)
-def send_push_notification(
+async def send_push_notification(
     request: SimpleNotificationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    x_api_key: Optional[str] = Header(None, alias="X-API-Key")
 ):
     """Convenience endpoint to send push notifications"""
     # Map priority string to int
@@ -75,15 +93,16 @@ def send_push_notification(
     )
     
     # Use the existing send_notification function, generate correlation_id here
-    return send_notification(notification, db, correlation_id=str(uuid.uuid4()))
+    return await send_notification(notification, db, correlation_id=str(uuid.uuid4()), x_api_key=x_api_key)
 
 
 @router.post("/send", response_model=schemas.APIResponse[schemas.NotificationResponse], status_code=status.HTTP_201_CREATED)
-def send_notification(
+async def send_notification(
     notification: schemas.NotificationRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     correlation_id: Optional[str] = None,
-    x_correlation_id: Optional[str] = Header(None, alias="X-Correlation-ID")
+    x_correlation_id: Optional[str] = Header(None, alias="X-Correlation-ID"),
+    x_api_key: Optional[str] = Header(None, alias="X-API-Key")
 ):
     """Send a notification (email or push)"""
     # Use provided correlation_id, or from header, or generate new one
@@ -93,62 +112,77 @@ def send_notification(
     
     logger.info(f"Received notification request: {request_id}, type: {notification.notification_type}")
     
-    # Idempotency check - cache first, then DB
-    if cache_mgr.check_idempotency(request_id):
+    # Per-user, per-template and per-API-key policies
+    rate_limiter = get_rate_limiter()
+    subjects = [("user", notification.user_id), ("template", notification.template_code)]
+    if x_api_key:
+        subjects.append(("api_key", x_api_key))
+    limits = rate_limiter.plan(subjects)
+    
+    # Idempotency reservation, cached user lookup and rate limit tokens in a single Redis round-trip
+    preflight = await cache_mgr.preflight(
+        request_id,
+        user_cache_key=user_cache_key(notification.user_id),
+        rate_limit=rate_limiter.script_inputs(limits) if limits.needed else None
+    )
+    user_data = local_users.get(notification.user_id)
+    if user_data is None:
+        user_data = preflight.user_data
+        remember_user(notification.user_id, user_data)
+        if user_data and user_flights.should_refresh(preflight.user_ttl_ms):
+            user_flights.refresh(notification.user_id)
+    
+    if preflight.verdict == "ok":
+        # Duplicates are not charged
+        limit = rate_limiter.complete(limits, preflight.rate_limit)
+        if not limit.allowed:
+            await cache_mgr.release_idempotency(request_id)
+            logger.warning(f"Rate limit exceeded for {limit.scope} (user {notification.user_id})")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded. Please try again later.",
+                headers={"Retry-After": str(max(1, math.ceil(limit.retry_after)))}
+            )
+    else:
+        rate_limiter.release(limits)
+
+    if preflight.verdict == "duplicate":
         logger.info(f"Duplicate request detected in cache: {request_id}")
         # Return existing notification from DB
-        existing = db.query(models.NotificationRequest).filter(
-            models.NotificationRequest.request_id == request_id
-        ).first()
+        existing = (await db.execute(
+            select(models.NotificationRequest).where(models.NotificationRequest.request_id == request_id)
+        )).scalars().first()
         if existing:
             return schemas.APIResponse(
                 data=existing,
                 message="Notification already processed (idempotent request)"
             )
     
-    # Check DB for duplicate (in case cache expired)
-    existing = db.query(models.NotificationRequest).filter(
-        models.NotificationRequest.request_id == request_id
-    ).first()
-    if existing:
-        logger.info(f"Duplicate request detected in DB: {request_id}")
-        # Update cache
-        cache_mgr.set_idempotency(request_id, ttl=86400)
-        return schemas.APIResponse(
-            data=existing,
-            message="Notification already processed (idempotent request)"
-        )
-    
-    # Rate limiting check (100 requests per minute per user)
-    rate_limit_key = f"rate_limit:user:{notification.user_id}"
-    if not cache_mgr.rate_limit_check(rate_limit_key, limit=100, window=60):
-        logger.warning(f"Rate limit exceeded for user {notification.user_id}")
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Rate limit exceeded. Please try again later."
+    try:
+        return await _create_and_queue_notification(
+            notification, db, correlation_id, user_data
         )
+    except Exception:
+        if preflight.verdict == "ok":
+            # Free our reservation so the client can retry this request_id
+            await cache_mgr.release_idempotency(request_id)
+        raise
+
+
+async def _create_and_queue_notification(
+    notification: schemas.NotificationRequest,
+    db: AsyncSession,
+    correlation_id: str,
+    user_data: Optional[Dict[str, Any]]
+):
+    """Resolve the recipient, persist the notification and stage it in the outbox"""
+    request_id = notification.request_id
     
     # Validate user exists and get recipient (with caching)
-    user_cache_key = f"user:{notification.user_id}"
-    user_data = cache_mgr.get(user_cache_key)
-    
     if not user_data:
         try:
-            response = requests.get(
-                f"{config.USER_SERVICE_URL}/api/v1/users/{notification.user_id}",
-                timeout=5
-            )
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="User not found")
-            response.raise_for_status()
-            user_response_data = response.json()
-            # Assuming the user data is in the 'data' field of the response, which is a list
-            if user_response_data and user_response_data.get("data") and len(user_response_data["data"]) > 0:
-                user_data = user_response_data["data"][0]
-                cache_mgr.set(user_cache_key, user_data, ttl=300)
-            else:
-                raise HTTPException(status_code=404, detail="User data not found in response")
-        except requests.RequestException as e:
+            user_data = await load_user(notification.user_id)
+        except httpx.HTTPError as e:
             logger.error(f"Error fetching user data: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -156,11 +190,7 @@ def send_notification(
             )
     
     # Determine recipient based on notification type
-    recipient = None
-    if notification.notification_type == schemas.NotificationType.email:
-        recipient = user_data.get("email")
-    elif notification.notification_type == schemas.NotificationType.push:
-        recipient = user_data.get("push_token")
+    recipient = recipient_for(notification.notification_type, user_data)
     
     if not recipient:
         raise HTTPException(
@@ -168,199 +198,264 @@ def send_notification(
             detail=f"No {notification.notification_type.value} recipient found for user"
         )
     
-    # Create notification record
-    db_notification = models.NotificationRequest(
-        request_id=request_id,
-        correlation_id=correlation_id,
-        user_id=notification.user_id,
-        notification_type=notification.notification_type.value,
-        template_code=notification.template_code,
-        recipient=recipient,
-        variables=notification.variables,  # Already a dict
-        status=models.NotificationStatus.pending,
-        priority=notification.priority,
-        extra_metadata=notification.extra_metadata
-    )
-    db.add(db_notification)
-    db.commit()
-    db.refresh(db_notification)
-    
-    # Publish to appropriate queue
-    try:
-        routing_key = notification.notification_type.value  # 'email' or 'push'
-        message = {
-            "notification_id": db_notification.id,
-            "request_id": request_id,
-            "correlation_id": correlation_id,
-            "user_id": str(notification.user_id),
-            "notification_type": notification.notification_type.value,
-            "template_code": notification.template_code,
-            "recipient": recipient,
-            "variables": notification.variables,  # Already a dict
-            "priority": notification.priority,
-            "extra_metadata": notification.extra_metadata,
-            "retry_count": 0
-        }
-        
-        queue_mgr.publish_message(
-            exchange=config.EXCHANGE_NAME,
-            routing_key=routing_key,
-            message=message,
-            correlation_id=correlation_id
-        )
-        
-        # Mark as processed for idempotency
-        cache_mgr.set_idempotency(request_id, ttl=86400)  # 24 hours
-        
-        logger.info(f"Notification queued successfully: {request_id}")
-        
-    except Exception as e:
-        logger.error(f"Error publishing to queue: {str(e)}")
-        db_notification.status = models.NotificationStatus.failed
-        db_notification.error_message = str(e)
-        db.commit()
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Failed to queue notification"
+    # Create notification record; the unique request_id makes the insert
+    # itself the idempotency check, so concurrent duplicates cannot both win
+    row = notification_row(notification, correlation_id, recipient)
+    db_notification = (await db.execute(
+        pg_insert(models.NotificationRequest)
+        .values(**row)
+        .on_conflict_do_nothing(index_elements=["request_id"])
+        .returning(models.NotificationRequest)
+    )).scalars().first()
+    
+    if db_notification is None:
+        logger.info(f"Duplicate request detected in DB: {request_id}")
+        existing = (await db.execute(
+            select(models.NotificationRequest).where(models.NotificationRequest.request_id == request_id)
+        )).scalars().first()
+        return schemas.APIResponse(
+            data=existing,
+            message="Notification already processed (idempotent request)"
         )
     
+    # Queue the message through the outbox in the same transaction; the outbox
+    # relay publishes it, so the request never waits on the broker
+    db.add(models.OutboxMessage(**outbox_entry(db_notification.id, row)))
+    await db.commit()
+    
+    logger.info(f"Notification queued successfully: {request_id}")
+    
     return schemas.APIResponse(
         data=db_notification,
         message="Notification queued successfully"
     )
 
-@router.post("/send/bulk", response_model=schemas.APIResponse[List[schemas.NotificationResponse]], status_code=status.HTTP_201_CREATED)
-def send_bulk_notifications(
+@router.post("/send/bulk", response_model=schemas.APIResponse[schemas.BulkJobResponse], status_code=status.HTTP_202_ACCEPTED)
+async def send_bulk_notifications(
     bulk_request: schemas.BulkNotificationRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     x_correlation_id: Optional[str] = Header(None)
 ):
-    """Send bulk notifications to multiple users"""
+    """Accept a bulk send and process it in the background"""
     correlation_id = x_correlation_id or str(uuid.uuid4())
     
     logger.info(f"Received bulk notification request for {len(bulk_request.user_ids)} users")
     
-    notifications = []
-    failed = []
+    job = await create_bulk_job(db, bulk_request, correlation_id)
+    get_bulk_job_runner().submit(job.id)
     
-    for user_id in bulk_request.user_ids:
-        try:
-            # Get user data
-            user_cache_key = f"user:{user_id}"
-            user_data = cache_mgr.get(user_cache_key)
-            
-            if not user_data:
-                response = requests.get(
-                    f"{config.USER_SERVICE_URL}/api/v1/users/{user_id}",
-                    timeout=5
-                )
-                if response.status_code == 404:
-                    failed.append({"user_id": str(user_id), "error": "User not found"})
-                    continue
-                user_response_data = response.json()
-                if user_response_data and user_response_data.get("data") and len(user_response_data["data"]) > 0:
-                    user_data = user_response_data["data"][0]
-                    cache_mgr.set(user_cache_key, user_data, ttl=300)
-                else:
-                    failed.append({"user_id": str(user_id), "error": "User data not found in response"})
-                    continue
-            
-            # Create individual notification request
-            notification = schemas.NotificationRequest(
-                notification_type=bulk_request.notification_type,
-                user_id=user_id,
-                template_code=bulk_request.template_code,
-                variables=bulk_request.variables,
-                request_id=str(uuid.uuid4()),
-                priority=0
-            )
-            
-            # Send notification
-            result = send_notification(notification, db, correlation_id)
-            notifications.append(result.data)
-            
-        except Exception as e:
-            logger.error(f"Error sending to user {user_id}: {str(e)}")
-            failed.append({"user_id": str(user_id), "error": str(e)})
+    logger.info(f"Bulk job {job.id} accepted for {job.total} users")
+    
+    return schemas.APIResponse(
+        data=job,
+        message=f"Bulk job accepted for {job.total} users"
+    )
+
+@router.post("/send/stream", response_model=schemas.APIResponse[schemas.StreamIngestResult])
+async def ingest_notification_stream(
+    request: Request,
+    notification_type: schemas.NotificationType,
+    db: AsyncSession = Depends(get_async_db),
+    x_correlation_id: Optional[str] = Header(None)
+):
+    """Queue personalised notifications from an NDJSON body.
+
+    Each line is {"user_id": ..., "template_code": ..., "variables": {...}}.
+    The body is read incrementally, so uploads of any size use flat memory.
+    """
+    correlation_id = x_correlation_id or str(uuid.uuid4())
     
-    logger.info(f"Bulk send completed: {len(notifications)} successful, {len(failed)} failed")
+    result = await ingest_ndjson(db, request.stream(), notification_type, correlation_id)
     
     return schemas.APIResponse(
-        data=notifications,
-        message=f"Sent {len(notifications)} notifications, {len(failed)} failed",
-        meta=schemas.PaginationMeta(
-            total=len(bulk_request.user_ids),
-            limit=len(bulk_request.user_ids),
-            page=1,
-            total_pages=1,
-            has_next=False,
-            has_previous=False
-        )
+        data=result,
+        message=f"Queued {result.queued} notifications, {result.failed} failed"
     )
 
-@router.get("/{notification_id}", response_model=schemas.APIResponse[schemas.NotificationResponse])
-def get_notification_status(notification_id: int, db: Session = Depends(get_db)):
-    """Get notification status by ID"""
-    notification = db.query(models.NotificationRequest).filter(
-        models.NotificationRequest.id == notification_id
-    ).first()
+@router.get("/bulk/{job_id}", response_model=schemas.APIResponse[schemas.BulkJobResponse])
+async def get_bulk_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get progress of a bulk job"""
+    job = await db.get(models.BulkJob, job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    
+    response = schemas.BulkJobResponse.model_validate(job)
+    if job.failed:
+        response.failures = await load_bulk_job_failures(db, job_id)
+    
+    return schemas.APIResponse(
+        data=response,
+        message="Bulk job retrieved successfully"
+    )
+
+async def _load_notification_response(notification_id: int, db: AsyncSession) -> schemas.NotificationResponse:
+    """Read a notification through the response cache"""
+    cached = await get_cached_notification(notification_id)
+    if cached.response is not None:
+        return cached.response
+    
+    notification = await db.get(models.NotificationRequest, notification_id)
     
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
+    # Skipped if a status change invalidated the entry while we were reading
+    response = await load_notification_response(notification)
+    await cache_notification(response, cached.version)
+    return response
+
+@router.get("/{notification_id}", response_model=schemas.APIResponse[schemas.NotificationResponse])
+async def get_notification_status(notification_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get notification status by ID"""
     return schemas.APIResponse(
-        data=notification,
+        data=await _load_notification_response(notification_id, db),
         message="Notification retrieved successfully"
     )
 
+@router.get("/{notification_id}/events")
+async def stream_notification_events(notification_id: int, request: Request):
+    """Stream status changes of a notification as server-sent events.
+
+    The current status is sent first; the stream ends once the
+    notification is delivered or failed.
+    """
+    hub = get_status_event_hub()
+    channel = notification_channel(notification_id)
+    # Subscribe before reading the current status so no change falls in between
+    queue = await hub.subscribe(channel)
+    try:
+        # Not a request dependency: that session would stay open for the whole stream
+        async with AsyncSessionLocal() as db:
+            current = await _load_notification_response(notification_id, db)
+    except Exception:
+        await hub.unsubscribe(channel, queue)
+        raise
+    
+    initial = {
+        "notification_id": current.id,
+        "user_id": str(current.user_id),
+        "status": current.status.value,
+        "error_message": current.error_message,
+        "timestamp": current.updated_at.isoformat()
+    }
+    return _event_stream(request, channel, queue, initial)
+
+@router.get("/user/{user_id}/events")
+async def stream_user_notification_events(user_id: UUID, request: Request):
+    """Stream status changes of all of a user's notifications as server-sent events"""
+    hub = get_status_event_hub()
+    channel = user_channel(user_id)
+    queue = await hub.subscribe(channel)
+    return _event_stream(request, channel, queue)
+
+def _event_stream(
+    request: Request,
+    channel: str,
+    queue: asyncio.Queue,
+    initial: Optional[Dict[str, Any]] = None
+) -> StreamingResponse:
+    terminal = {schemas.NotificationStatus.delivered.value, schemas.NotificationStatus.failed.value}
+    single_notification = initial is not None
+    
+    async def events():
+        try:
+            if single_notification:
+                yield format_sse(initial)
+                if initial["status"] in terminal:
+                    return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=config.SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield format_sse()
+                    continue
+                yield format_sse(event)
+                if single_notification and event["status"] in terminal:
+                    return
+        finally:
+            await get_status_event_hub().unsubscribe(channel, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/request/{request_id}", response_model=schemas.APIResponse[schemas.NotificationResponse])
-def get_notification_by_request_id(request_id: str, db: Session = Depends(get_db)):
+async def get_notification_by_request_id(request_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get notification by request ID (for idempotency tracking)"""
-    notification = db.query(models.NotificationRequest).filter(
-        models.NotificationRequest.request_id == request_id
-    ).first()
-    
-    if not notification:
-        raise HTTPException(status_code=404, detail="Notification not found")
+    notification_id = await get_cached_notification_id(request_id)
+    if notification_id is None:
+        notification_id = (await db.execute(
+            select(models.NotificationRequest.id).where(models.NotificationRequest.request_id == request_id)
+        )).scalar_one_or_none()
+        
+        if notification_id is None:
+            raise HTTPException(status_code=404, detail="Notification not found")
     
     return schemas.APIResponse(
-        data=notification,
+        data=await _load_notification_response(notification_id, db),
         message="Notification retrieved successfully"
     )
 
 @router.get("/user/{user_id}", response_model=schemas.APIResponse[List[schemas.NotificationResponse]])
-def get_user_notifications(
+async def get_user_notifications(
     user_id: UUID,
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    skip: int = Query(0, ge=0, description="Offset pagination, ignored when a cursor is given"),
     limit: int = Query(100, ge=1, le=1000),
     notification_type: Optional[str] = None,
     status: Optional[schemas.NotificationStatus] = None,
-    db: Session = Depends(get_db)
+    include_total: bool = Query(False, description="Also return the (cached) total count"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all notifications for a user"""
-    query = db.query(models.NotificationRequest).filter(
-        models.NotificationRequest.user_id == user_id
-    )
-    
+    """Get a user's notifications, newest first.
+
+    Pages are fetched by seeking past the (created_at, id) of the previous
+    page's last item, so deep pages cost the same as the first one.
+    """
+    filters = [models.NotificationRequest.user_id == user_id]
     if notification_type:
-        query = query.filter(models.NotificationRequest.notification_type == notification_type)
+        filters.append(models.NotificationRequest.notification_type == notification_type)
     if status:
-        query = query.filter(models.NotificationRequest.status == status.value)
+        filters.append(models.NotificationRequest.status == status.value)
     
-    total = query.count()
-    notifications = query.order_by(desc(models.NotificationRequest.created_at)).offset(skip).limit(limit).all()
+    query = select(models.NotificationRequest).where(*filters).order_by(
+        desc(models.NotificationRequest.created_at),
+        desc(models.NotificationRequest.id)
+    )
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(
+            tuple_(models.NotificationRequest.created_at, models.NotificationRequest.id)
+            < tuple_(cursor_created_at, cursor_id)
+        )
+    elif skip:
+        query = query.offset(skip)
+    
+    # Fetch one extra row to learn whether there is a next page
+    notifications = (await db.execute(query.limit(limit + 1))).scalars().all()
+    has_next = len(notifications) > limit
+    notifications = notifications[:limit]
     
-    # Calculate pagination meta
-    total_pages = (total + limit - 1) // limit
-    current_page = (skip // limit) + 1
+    total = None
+    if include_total:
+        total = await _count_user_notifications(db, user_id, notification_type, status, filters)
     
     meta = schemas.PaginationMeta(
         total=total,
         limit=limit,
-        page=current_page,
-        total_pages=total_pages,
-        has_next=current_page < total_pages,
-        has_previous=current_page > 1
+        page=None if cursor else (skip // limit) + 1,
+        total_pages=(total + limit - 1) // limit if total is not None else None,
+        has_next=has_next,
+        has_previous=bool(cursor) or skip > 0,
+        next_cursor=encode_cursor(notifications[-1].created_at, notifications[-1].id) if has_next else None
     )
     
     return schemas.APIResponse(
@@ -369,11 +464,55 @@ def get_user_notifications(
         meta=meta
     )
 
+async def _count_user_notifications(
+    db: AsyncSession,
+    user_id: UUID,
+    notification_type: Optional[str],
+    status: Optional[schemas.NotificationStatus],
+    filters: list
+) -> int:
+    """Count a user's notifications, cached briefly so paging does not rescan"""
+    cache_key = f"notification_count:{user_id}:{notification_type or '*'}:{status.value if status else '*'}"
+    total = await cache_mgr.get(cache_key)
+    if total is None:
+        total = (await db.execute(
+            select(func.count()).select_from(models.NotificationRequest).where(*filters)
+        )).scalar()
+        await cache_mgr.set(cache_key, total, ttl=config.NOTIFICATION_COUNT_CACHE_TTL)
+    return total
+
+@router.post("/status/batch", response_model=schemas.APIResponse[schemas.NotificationStatusBatchResult])
+async def update_notification_statuses(
+    batch: schemas.NotificationStatusBatch,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Apply a batch of status updates in one statement (used by worker services)"""
+    valid, skipped = [], []
+    for status_update in batch.updates:
+        if status_update.notification_id.isdigit():
+            valid.append(status_update)
+        else:
+            skipped.append(status_update.notification_id)
+    
+    updated = await save_status_updates(db, valid)
+    await db.commit()
+    await announce_status_changes(updated)
+    
+    skipped.extend(
+        status_update.notification_id for status_update in valid
+        if int(status_update.notification_id) not in updated
+    )
+    
+    return schemas.APIResponse(
+        data=schemas.NotificationStatusBatchResult(updated=len(updated), skipped=skipped),
+        message=f"Updated {len(updated)} notification statuses"
+    )
+
 @router.post("/{notification_type}/status", response_model=schemas.APIResponse[schemas.NotificationResponse])
-def update_notification_status(
+async def update_notification_status(
     notification_type: str,
     status_update: schemas.NotificationStatusUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update notification status (used by worker services)"""
     try:
@@ -381,27 +520,27 @@ def update_notification_status(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid notification_id format")
     
-    notification = db.query(models.NotificationRequest).filter(
-        models.NotificationRequest.id == notification_id
-    ).first()
+    notification = await db.get(models.NotificationRequest, notification_id)
     
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.status = status_update.status
-    if status_update.error:
-        notification.error_message = status_update.error
+    # Same path as batches and the status consumer: stale events are skipped, and
+    # in write-behind mode the update lands in the status store
+    applied = await save_status_updates(db, [status_update])
+    await db.commit()
     
-    if status_update.status == schemas.NotificationStatus.delivered:
-        notification.sent_at = status_update.timestamp or datetime.utcnow()
+    if notification_id not in applied:
+        raise HTTPException(status_code=409, detail="Status update is older than the stored status")
     
-    db.commit()
-    db.refresh(notification)
+    await announce_status_changes({notification_id: applied[notification_id]})
+    await db.refresh(notification)
+    response = await load_notification_response(notification)
     
     logger.info(f"Notification {notification_id} status updated to {status_update.status}")
     
     return schemas.APIResponse(
-        data=notification,
+        data=response,
         message="Notification status updated successfully"
     )
 
@@ -411,110 +550,116 @@ def update_notification_status(
 # ============================================
 
 @user_router.post("/users", status_code=status.HTTP_201_CREATED)
-def create_user(user_data: dict):
+async def create_user(user_data: dict):
     """Proxy request to User Service - Create a new user"""
     try:
-        response = requests.post(
-            f"{config.USER_SERVICE_URL}/api/v1/users",
-            json=user_data,
-            timeout=10
+        response = await proxy_request(
+            "user",
+            "POST",
+            "/api/v1/users",
+            json=user_data
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        await invalidate_proxy_cache("users")
+        return response
+    except httpx.HTTPError as e:
         logger.error(f"Failed to create user: {str(e)}")
         raise HTTPException(status_code=500, detail=f"User service error: {str(e)}")
 
 
 @user_router.get("/users/{user_id}")
-def get_user(user_id: str):
+async def get_user(user_id: str):
     """Proxy request to User Service - Get user by ID"""
     try:
-        response = requests.get(
-            f"{config.USER_SERVICE_URL}/api/v1/users/{user_id}",
-            timeout=10
+        return await proxy_request(
+            "user",
+            "GET",
+            f"/api/v1/users/{user_id}"
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Failed to get user: {str(e)}")
         raise HTTPException(status_code=500, detail=f"User service error: {str(e)}")
 
 
 @user_router.get("/users")
-def list_users():
+async def list_users(if_none_match: Optional[str] = Header(None)):
     """Proxy request to User Service - List all users"""
     try:
-        response = requests.get(
-            f"{config.USER_SERVICE_URL}/api/v1/users",
-            timeout=10
+        return await cached_proxy_get(
+            "user",
+            "/api/v1/users",
+            tags=["users"],
+            if_none_match=if_none_match
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Failed to list users: {str(e)}")
         raise HTTPException(status_code=500, detail=f"User service error: {str(e)}")
 
 
 @user_router.put("/users/{user_id}")
-def update_user(user_id: str, user_data: dict):
+async def update_user(user_id: str, user_data: dict):
     """Proxy request to User Service - Update user"""
     try:
-        response = requests.put(
-            f"{config.USER_SERVICE_URL}/api/v1/users/{user_id}",
-            json=user_data,
-            timeout=10
+        response = await proxy_request(
+            "user",
+            "PUT",
+            f"/api/v1/users/{user_id}",
+            json=user_data
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        await invalidate_user(user_id)
+        await invalidate_proxy_cache("users", f"users:{user_id}")
+        return response
+    except httpx.HTTPError as e:
         logger.error(f"Failed to update user: {str(e)}")
         raise HTTPException(status_code=500, detail=f"User service error: {str(e)}")
 
 
 @user_router.get("/users/{user_id}/preferences")
-def get_user_preferences(user_id: str):
+async def get_user_preferences(user_id: str, if_none_match: Optional[str] = Header(None)):
     """Proxy request to User Service - Get user notification preferences"""
     try:
-        response = requests.get(
-            f"{config.USER_SERVICE_URL}/api/v1/users/{user_id}/preferences",
-            timeout=10
+        return await cached_proxy_get(
+            "user",
+            f"/api/v1/users/{user_id}/preferences",
+            tags=[f"users:{user_id}"],
+            if_none_match=if_none_match
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Failed to get preferences: {str(e)}")
         raise HTTPException(status_code=500, detail=f"User service error: {str(e)}")
 
 
 @user_router.put("/users/{user_id}/preferences")
-def update_user_preferences(user_id: str, preference_data: dict):
+async def update_user_preferences(user_id: str, preference_data: dict):
     """Proxy request to User Service - Update user notification preferences"""
     try:
-        response = requests.put(
-            f"{config.USER_SERVICE_URL}/api/v1/users/{user_id}/preferences",
-            json=preference_data,
-            timeout=10
+        response = await proxy_request(
+            "user",
+            "PUT",
+            f"/api/v1/users/{user_id}/preferences",
+            json=preference_data
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        await invalidate_user(user_id)
+        await invalidate_proxy_cache("users", f"users:{user_id}")
+        return response
+    except httpx.HTTPError as e:
         logger.error(f"Failed to update preferences: {str(e)}")
         raise HTTPException(status_code=500, detail=f"User service error: {str(e)}")
 
 
 @user_router.put("/users/{user_id}/push-token")
-def update_push_token(user_id: str, token_data: dict):
+async def update_push_token(user_id: str, token_data: dict):
     """Proxy request to User Service - Update user push notification token"""
     try:
-        response = requests.put(
-            f"{config.USER_SERVICE_URL}/api/v1/users/{user_id}/push-token",
-            json=token_data,
-            timeout=10
+        response = await proxy_request(
+            "user",
+            "PUT",
+            f"/api/v1/users/{user_id}/push-token",
+            json=token_data
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        await invalidate_user(user_id)
+        await invalidate_proxy_cache("users", f"users:{user_id}")
+        return response
+    except httpx.HTTPError as e:
         logger.error(f"Failed to update push token: {str(e)}")
         raise HTTPException(status_code=500, detail=f"User service error: {str(e)}")
 
@@ -524,108 +669,110 @@ def update_push_token(user_id: str, token_data: dict):
 # ============================================
 
 @template_router.post("/templates", status_code=status.HTTP_201_CREATED)
-def create_template(template_data: dict):
+async def create_template(template_data: dict):
     """Proxy request to Template Service - Create a new template"""
     try:
-        response = requests.post(
-            f"{config.TEMPLATE_SERVICE_URL}/api/v1/templates",
-            json=template_data,
-            timeout=10
+        response = await proxy_request(
+            "template",
+            "POST",
+            "/api/v1/templates",
+            json=template_data
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        await invalidate_proxy_cache("templates")
+        return response
+    except httpx.HTTPError as e:
         logger.error(f"Failed to create template: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Template service error: {str(e)}")
 
 
 @template_router.get("/templates/{template_id}")
-def get_template(template_id: str):
+async def get_template(template_id: str, if_none_match: Optional[str] = Header(None)):
     """Proxy request to Template Service - Get template by ID"""
     try:
-        response = requests.get(
-            f"{config.TEMPLATE_SERVICE_URL}/api/v1/templates/{template_id}",
-            timeout=10
+        return await cached_proxy_get(
+            "template",
+            f"/api/v1/templates/{template_id}",
+            tags=["templates"],
+            if_none_match=if_none_match
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Failed to get template: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Template service error: {str(e)}")
 
 
 @template_router.get("/templates")
-def list_templates():
+async def list_templates(if_none_match: Optional[str] = Header(None)):
     """Proxy request to Template Service - List all templates"""
     try:
-        response = requests.get(
-            f"{config.TEMPLATE_SERVICE_URL}/api/v1/templates",
-            timeout=10
+        return await cached_proxy_get(
+            "template",
+            "/api/v1/templates",
+            tags=["templates"],
+            if_none_match=if_none_match
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Failed to list templates: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Template service error: {str(e)}")
 
 
 @template_router.get("/templates/code/{code}")
-def get_template_by_code(code: str):
+async def get_template_by_code(code: str, if_none_match: Optional[str] = Header(None)):
     """Proxy request to Template Service - Get template by code"""
     try:
-        response = requests.get(
-            f"{config.TEMPLATE_SERVICE_URL}/api/v1/templates/code/{code}",
-            timeout=10
+        return await cached_proxy_get(
+            "template",
+            f"/api/v1/templates/code/{code}",
+            tags=["templates"],
+            if_none_match=if_none_match
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Failed to get template by code: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Template service error: {str(e)}")
 
 
 @template_router.put("/templates/{template_id}")
-def update_template(template_id: str, template_data: dict):
+async def update_template(template_id: str, template_data: dict):
     """Proxy request to Template Service - Update template"""
     try:
-        response = requests.put(
-            f"{config.TEMPLATE_SERVICE_URL}/api/v1/templates/{template_id}",
-            json=template_data,
-            timeout=10
+        response = await proxy_request(
+            "template",
+            "PUT",
+            f"/api/v1/templates/{template_id}",
+            json=template_data
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        await invalidate_proxy_cache("templates")
+        return response
+    except httpx.HTTPError as e:
         logger.error(f"Failed to update template: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Template service error: {str(e)}")
 
 
 @template_router.delete("/templates/{template_id}")
-def delete_template(template_id: str):
+async def delete_template(template_id: str):
     """Proxy request to Template Service - Delete template"""
     try:
-        response = requests.delete(
-            f"{config.TEMPLATE_SERVICE_URL}/api/v1/templates/{template_id}",
-            timeout=10
+        response = await proxy_request(
+            "template",
+            "DELETE",
+            f"/api/v1/templates/{template_id}"
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        await invalidate_proxy_cache("templates")
+        return response
+    except httpx.HTTPError as e:
         logger.error(f"Failed to delete template: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Template service error: {str(e)}")
 
 
 @template_router.post("/templates/render")
-def render_template(render_data: dict):
+async def render_template(render_data: dict):
     """Proxy request to Template Service - Render template with variables"""
     try:
-        response = requests.post(
-            f"{config.TEMPLATE_SERVICE_URL}/api/v1/templates/render",
-            json=render_data,
-            timeout=10
+        return await proxy_request(
+            "template",
+            "POST",
+            "/api/v1/templates/render",
+            json=render_data
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Failed to render template: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Template service error: {str(e)}")
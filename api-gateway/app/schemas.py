@@ -8,12 +8,13 @@ from uuid import UUID
 T = TypeVar("T")
 
 class PaginationMeta(BaseModel):
-    total: int = Field(..., description="Total number of items", example=100)
+    total: Optional[int] = Field(None, description="Total number of items, when requested", example=100)
     limit: int = Field(..., description="Number of items per page", example=10)
-    page: int = Field(..., description="Current page number", example=1)
-    total_pages: int = Field(..., description="Total number of pages", example=10)
+    page: Optional[int] = Field(None, description="Current page number (offset pagination only)", example=1)
+    total_pages: Optional[int] = Field(None, description="Total number of pages, when the total is known", example=10)
     has_next: bool = Field(..., description="Whether there is a next page", example=True)
     has_previous: bool = Field(..., description="Whether there is a previous page", example=False)
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (keyset pagination)", example="WyIyMDI1LTExLTEzVDA5OjAwOjAwIiwgNDJd")
 
 class APIResponse(BaseModel, Generic[T]):
     success: bool = Field(True, description="Indicates if the operation was successful", example=True)
@@ -99,6 +100,13 @@ class NotificationStatusUpdate(BaseModel):
     timestamp: Optional[datetime] = None
     error: Optional[str] = None
 
+class NotificationStatusBatch(BaseModel):
+    updates: List[NotificationStatusUpdate] = Field(..., description="Status updates to apply", max_length=5000)
+
+class NotificationStatusBatchResult(BaseModel):
+    updated: int = Field(..., description="Number of notifications updated", example=98)
+    skipped: List[str] = Field(..., description="Notification IDs that are unknown or already have a newer status", example=["17"])
+
 class BulkNotificationRequest(BaseModel):
     user_ids: List[UUID] = Field(
         ..., 
@@ -121,4 +129,51 @@ class BulkNotificationRequest(BaseModel):
         example={"campaign": "Summer Sale", "discount": "20%"}
     )
 
+class StreamNotificationItem(BaseModel):
+    """One line of an NDJSON ingestion upload"""
+    user_id: UUID = Field(..., description="Unique identifier of the recipient user", example="123e4567-e89b-12d3-a456-426614174000")
+    template_code: str = Field(..., description="Code of the template to use", example="welcome_email")
+    variables: Dict[str, Any] = Field(default_factory=dict, description="Variables for this recipient", example={"name": "John Doe"})
+    priority: int = Field(0, description="Notification priority (0=normal, 1=high, 2=urgent)", example=0, ge=0, le=2)
+
+class StreamIngestError(BaseModel):
+    line: int = Field(..., description="Line number in the upload", example=42)
+    user_id: Optional[str] = Field(None, description="User on that line, if it parsed", example="123e4567-e89b-12d3-a456-426614174000")
+    error: str = Field(..., description="Reason the line was not queued", example="User not found")
+
+class StreamIngestResult(BaseModel):
+    received: int = Field(..., description="Non-empty lines read", example=100000)
+    queued: int = Field(..., description="Notifications queued", example=99880)
+    failed: int = Field(..., description="Lines that could not be queued", example=120)
+    errors: List[StreamIngestError] = Field(..., description="First failures, capped at 100")
+
+class BulkJobStatus(str, Enum):
+    """Bulk job lifecycle states"""
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+class BulkRecipientFailure(BaseModel):
+    user_id: str = Field(..., description="Recipient that could not be queued", example="123e4567-e89b-12d3-a456-426614174000")
+    error: str = Field(..., description="Reason the recipient was not queued", example="User not found")
+
+class BulkJobResponse(BaseModel):
+    job_id: str = Field(..., validation_alias="id", description="Bulk job ID", example="6f1c2a9e-1b7d-4a51-9c61-3c1f0c2d8e4b")
+    correlation_id: str = Field(..., description="Correlation ID shared by the job's notifications", example="corr_123e4567")
+    notification_type: str = Field(..., description="Type of notification (email or push)", example="email")
+    template_code: str = Field(..., description="Template code used", example="promo_campaign")
+    status: BulkJobStatus = Field(..., description="Current job status", example="running")
+    total: int = Field(..., description="Number of recipients in the job", example=100000)
+    queued: int = Field(..., description="Notifications queued so far", example=42000)
+    failed: int = Field(..., description="Recipients that could not be queued", example=120)
+    pending: int = Field(..., description="Recipients not yet processed", example=57880)
+    failures: List[BulkRecipientFailure] = Field(default_factory=list, description="First failed recipients, capped at 100")
+    error_message: Optional[str] = Field(None, description="Error that stopped the job", example=None)
+    created_at: datetime = Field(..., description="Timestamp when the job was accepted", example="2025-11-13T09:00:00Z")
+    updated_at: datetime = Field(..., description="Timestamp of the last progress update", example="2025-11-13T09:00:05Z")
+    completed_at: Optional[datetime] = Field(None, description="Timestamp when the job finished", example=None)
 
+    class Config:
+        from_attributes = True
+        populate_by_name = True
@@ -0,0 +1,181 @@
+"""Consumer that applies worker status events from the broker in batches"""
+import asyncio
+import json
+import aio_pika
+from pydantic import ValidationError
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from typing import List
+
+from . import schemas, config
+from .database import AsyncSessionLocal
+from .queue_manager import QueueManager, OutgoingMessage
+from .status_store import save_status_updates
+from .status_events import announce_status_changes
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("status-consumer")
+
+# Longest pause before redelivering a batch that keeps failing
+MAX_RETRY_DELAY = 30.0
+
+def is_transient(error: Exception) -> bool:
+    """Lost connections and timeouts, which redelivery can get past"""
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated or isinstance(error, (InterfaceError, OperationalError))
+    return isinstance(error, (OSError, asyncio.TimeoutError, RedisConnectionError, RedisTimeoutError))
+
+class StatusEventConsumer:
+    """Reads the status queue and applies events in batched transactions.
+
+    Messages are acked only after the batch that contains them commits, so
+    a crash or database error redelivers them. Redelivery is harmless:
+    events older than the stored status are ignored. A batch that fails
+    max_attempts times in a row for anything other than a lost connection
+    is applied one event at a time, and events that still fail are parked
+    in the failed queue so they stop blocking the ones behind them.
+    """
+
+    def __init__(
+        self,
+        queue_manager: QueueManager,
+        queue_name: str,
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+        max_attempts: int = 3
+    ):
+        self.queue_manager = queue_manager
+        self.queue_name = queue_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.channel = None
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._consumer_tag = None
+        self._task = None
+        self._failures = 0
+
+    async def start(self):
+        """Start consuming status events"""
+        await self.queue_manager.connect()
+        self.channel = await self.queue_manager.connection.channel()
+        # Enough unacked messages in flight to fill a batch while the previous one commits
+        await self.channel.set_qos(prefetch_count=self.batch_size * 2)
+
+        queue = await self.channel.get_queue(self.queue_name, ensure=False)
+        self._consumer_tag = await queue.consume(self._incoming.put)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Status consumer started on {self.queue_name} (batch size {self.batch_size})")
+
+    async def stop(self):
+        """Stop consuming; unacked events are redelivered by the broker"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.channel is not None and not self.channel.is_closed:
+            await self.channel.close()
+        logger.info("Status consumer stopped")
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self.apply_batch(batch)
+                self._failures = 0
+                continue
+            except Exception as e:
+                error = e
+            self._failures += 1
+            logger.error(f"Error applying {len(batch)} status events (attempt {self._failures}): {str(error)}")
+
+            if self._failures >= self.max_attempts and not is_transient(error):
+                await self.apply_individually(batch)
+                continue
+            # Requeued messages go back to the head of the queue and make up the next batch
+            await batch[-1].nack(multiple=True, requeue=True)
+            await asyncio.sleep(min(2 ** (self._failures - 1), MAX_RETRY_DELAY))
+
+    async def apply_individually(self, batch: List[aio_pika.abc.AbstractIncomingMessage]):
+        """Apply events one per transaction, parking those that fail in the failed queue"""
+        for index, message in enumerate(batch):
+            try:
+                await self.apply_batch([message])
+                continue
+            except Exception as e:
+                error = e
+            if is_transient(error) or not await self._dead_letter(message, error):
+                # Everything before this message is settled, so the rest go back in order
+                logger.error(f"Error applying status event, requeueing {len(batch) - index} events: {str(error)}")
+                await batch[-1].nack(multiple=True, requeue=True)
+                await asyncio.sleep(MAX_RETRY_DELAY)
+                return
+        self._failures = 0
+
+    async def _dead_letter(self, message: aio_pika.abc.AbstractIncomingMessage, error: Exception) -> bool:
+        """Move an event that cannot be applied to the failed queue; False if that did not work"""
+        logger.error(f"Parking status event in {config.FAILED_QUEUE}: {str(error)}")
+        try:
+            await self.queue_manager.publish_many([OutgoingMessage(
+                config.EXCHANGE_NAME,
+                "failed",
+                {"status_event": message.body.decode("utf-8", "replace"), "error": str(error)},
+                message.correlation_id
+            )])
+        except Exception as e:
+            logger.error(f"Error parking status event: {str(e)}")
+            return False
+        await message.ack()
+        return True
+
+    async def _next_batch(self) -> List[aio_pika.abc.AbstractIncomingMessage]:
+        """Wait for one event, then collect more until the batch fills or the interval ends"""
+        batch = [await self._incoming.get()]
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._incoming.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def apply_batch(self, batch: List[aio_pika.abc.AbstractIncomingMessage]):
+        """Apply a batch of events in one transaction, then ack them together"""
+        updates = []
+        for message in batch:
+            try:
+                update = schemas.NotificationStatusUpdate(**json.loads(message.body))
+                int(update.notification_id)
+                updates.append(update)
+            except (ValueError, TypeError, ValidationError) as e:
+                logger.error(f"Dropping malformed status event: {str(e)}")
+
+        async with AsyncSessionLocal() as db:
+            updated = await save_status_updates(db, updates)
+            await db.commit()
+        await announce_status_changes(updated)
+
+        # Deliveries on this channel are handled in order, so one ack covers the batch
+        await batch[-1].ack(multiple=True)
+
+# Global status consumer instance
+status_consumer = None
+
+def get_status_consumer(queue_manager: QueueManager) -> StatusEventConsumer:
+    """Get or create status consumer instance"""
+    global status_consumer
+    if status_consumer is None:
+        status_consumer = StatusEventConsumer(
+            queue_manager,
+            config.STATUS_QUEUE,
+            batch_size=config.STATUS_CONSUMER_BATCH_SIZE,
+            flush_interval=config.STATUS_CONSUMER_FLUSH_INTERVAL,
+            max_attempts=config.STATUS_CONSUMER_MAX_ATTEMPTS
+        )
+    return status_consumer
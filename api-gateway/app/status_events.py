@@ -0,0 +1,139 @@
+"""Status change notifications over Redis pub/sub, fanned out to SSE streams"""
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set
+
+from . import config
+from .cache_manager import get_cache_manager
+from .notification_cache import invalidate_notifications
+from .status_updates import AppliedStatus
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("status-events")
+
+cache_mgr = get_cache_manager(config.REDIS_URL)
+
+def notification_channel(notification_id: int) -> str:
+    return f"notification_events:{notification_id}"
+
+def user_channel(user_id) -> str:
+    return f"notification_events:user:{user_id}"
+
+def status_event(notification_id: int, change: AppliedStatus) -> Dict[str, Any]:
+    return {
+        "notification_id": notification_id,
+        "user_id": str(change.user_id),
+        "status": change.status.value,
+        "error_message": change.error,
+        "timestamp": change.event_at.isoformat()
+    }
+
+async def publish_status_events(changes: Dict[int, AppliedStatus]):
+    """Publish committed status changes to the notification and user channels"""
+    if not changes:
+        return
+    try:
+        await cache_mgr.connect()
+        async with cache_mgr.client.pipeline(transaction=False) as pipe:
+            for notification_id, change in changes.items():
+                payload = json.dumps(status_event(notification_id, change))
+                pipe.publish(notification_channel(notification_id), payload)
+                pipe.publish(user_channel(change.user_id), payload)
+            await pipe.execute()
+    except Exception as e:
+        # Streams are best effort; clients can always fall back to polling
+        logger.error(f"Error publishing status events: {str(e)}")
+
+async def announce_status_changes(changes: Dict[int, AppliedStatus]):
+    """Invalidate cached responses and notify listeners, once changes are committed"""
+    await invalidate_notifications(changes)
+    await publish_status_events(changes)
+
+class StatusEventHub:
+    """Shares one Redis pub/sub connection between all SSE streams.
+
+    Channels are subscribed while at least one stream listens to them and
+    messages are fanned out to per-stream queues in process, so open
+    streams do not each hold a Redis connection.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, channel: str) -> asyncio.Queue:
+        """Start receiving events from a channel"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        async with self._lock:
+            if self._pubsub is None:
+                await cache_mgr.connect()
+                self._pubsub = cache_mgr.client.pubsub(ignore_subscribe_messages=True)
+            if channel not in self._subscribers:
+                self._subscribers[channel] = set()
+                await self._pubsub.subscribe(channel)
+            self._subscribers[channel].add(queue)
+            if self._task is None or self._task.done():
+                self._task = asyncio.create_task(self._listen())
+        return queue
+
+    async def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        """Stop receiving events from a channel"""
+        async with self._lock:
+            queues = self._subscribers.get(channel)
+            if queues is None:
+                return
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[channel]
+                await self._pubsub.unsubscribe(channel)
+
+    async def _listen(self):
+        while self._subscribers:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except Exception as e:
+                logger.error(f"Error reading status events: {str(e)}")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+
+            event = json.loads(message["data"])
+            for queue in list(self._subscribers.get(message["channel"], ())):
+                if queue.full():
+                    # A slow client only loses its oldest events, never blocks the others
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+    async def close(self):
+        """Close the shared pub/sub connection"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._subscribers.clear()
+
+def format_sse(event: Optional[Dict[str, Any]] = None) -> str:
+    """Format a status event, or a keep-alive comment, for an SSE stream"""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"event: status\ndata: {json.dumps(event)}\n\n"
+
+# Global status event hub instance
+status_event_hub = None
+
+def get_status_event_hub() -> StatusEventHub:
+    """Get or create status event hub instance"""
+    global status_event_hub
+    if status_event_hub is None:
+        status_event_hub = StatusEventHub()
+    return status_event_hub
@@ -0,0 +1,244 @@
+"""Optional write-behind store for notification status in Redis"""
+import asyncio
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Set
+
+from . import models, schemas, config
+from .cache_manager import get_cache_manager
+from .database import AsyncSessionLocal
+from .status_updates import AppliedStatus, apply_status_updates, latest_status_updates
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("status-store")
+
+STATUS_KEY_PREFIX = "notification_status:"
+DIRTY_SET_KEY = "notification_status:dirty"
+
+# Fixed-width timestamps compare correctly as strings inside Lua
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+# Writes each status into its hash unless the hash already holds a newer
+# event, and marks the notification dirty for the flusher.
+# KEYS: one status hash per update, then the dirty set
+# ARGV: hash ttl, then (notification id, status, error, event_at) per update
+# Returns the notification ids that were written
+RECORD_STATUS_SCRIPT = """
+local dirty = KEYS[#KEYS]
+local recorded = {}
+for i = 1, #KEYS - 1 do
+    local base = 2 + (i - 1) * 4
+    local current = redis.call('HGET', KEYS[i], 'event_at')
+    if not current or current <= ARGV[base + 3] then
+        redis.call('HSET', KEYS[i], 'status', ARGV[base + 1], 'error', ARGV[base + 2], 'event_at', ARGV[base + 3])
+        redis.call('EXPIRE', KEYS[i], ARGV[1])
+        redis.call('SADD', dirty, ARGV[base])
+        recorded[#recorded + 1] = ARGV[base]
+    end
+end
+return recorded
+"""
+
+def _format_timestamp(timestamp: datetime) -> str:
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp.strftime(TIMESTAMP_FORMAT)
+
+class StatusStore:
+    """Keeps the latest status of each notification in a Redis hash.
+
+    Status writes land in Redis and a background flusher moves them to
+    notification_requests in bulk; reads merge the Redis state over the
+    database row so they stay accurate between flushes.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, batch_size: int = 1000, ttl: int = 3600):
+        self.cache_mgr = get_cache_manager(config.REDIS_URL)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.record_script = None
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    async def _client(self):
+        await self.cache_mgr.connect()
+        if self.record_script is None:
+            self.record_script = self.cache_mgr.client.register_script(RECORD_STATUS_SCRIPT)
+        return self.cache_mgr.client
+
+    async def record(self, updates: List[schemas.NotificationStatusUpdate]) -> Set[int]:
+        """Write status updates to Redis, returns the ids not superseded by a newer event"""
+        if not updates:
+            return set()
+        await self._client()
+
+        now = datetime.utcnow()
+        keys, args = [], [self.ttl]
+        for status_update in updates:
+            notification_id = int(status_update.notification_id)
+            keys.append(f"{STATUS_KEY_PREFIX}{notification_id}")
+            args.extend([
+                notification_id,
+                status_update.status.value,
+                status_update.error or "",
+                _format_timestamp(status_update.timestamp or now)
+            ])
+        recorded = await self.record_script(keys=keys + [DIRTY_SET_KEY], args=args)
+        return {int(notification_id) for notification_id in recorded}
+
+    async def merge(self, notification: models.NotificationRequest) -> schemas.NotificationResponse:
+        """Overlay a newer Redis status on a database row"""
+        response = schemas.NotificationResponse.model_validate(notification)
+        try:
+            client = await self._client()
+            state = await client.hgetall(f"{STATUS_KEY_PREFIX}{notification.id}")
+        except Exception as e:
+            logger.error(f"Error reading status from Redis: {str(e)}")
+            return response
+        if not state:
+            return response
+
+        event_at = datetime.strptime(state["event_at"], TIMESTAMP_FORMAT)
+        if notification.status_updated_at is not None and event_at < notification.status_updated_at:
+            return response
+
+        status = schemas.NotificationStatus(state["status"])
+        return response.model_copy(update={
+            "status": status,
+            "error_message": state["error"] or response.error_message,
+            "sent_at": event_at if status == schemas.NotificationStatus.delivered else response.sent_at
+        })
+
+    def start(self):
+        """Start the background flusher"""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Status store flusher started (every {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the flusher after writing everything still pending"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        try:
+            while await self.flush() == self.batch_size:
+                pass
+        except Exception as e:
+            logger.error(f"Error flushing statuses on shutdown: {str(e)}")
+        logger.info("Status store flusher stopped")
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                flushed = await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing statuses: {str(e)}")
+                flushed = 0
+
+            if flushed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def flush(self) -> int:
+        """Write one batch of dirty statuses to the database, returns how many"""
+        client = await self._client()
+        ids = await client.spop(DIRTY_SET_KEY, self.batch_size)
+        if not ids:
+            return 0
+
+        async with client.pipeline(transaction=False) as pipe:
+            for notification_id in ids:
+                pipe.hgetall(f"{STATUS_KEY_PREFIX}{notification_id}")
+            states = await pipe.execute()
+
+        updates = [
+            schemas.NotificationStatusUpdate(
+                notification_id=notification_id,
+                status=state["status"],
+                timestamp=datetime.strptime(state["event_at"], TIMESTAMP_FORMAT),
+                error=state["error"] or None
+            )
+            for notification_id, state in zip(ids, states)
+            if state
+        ]
+        try:
+            async with AsyncSessionLocal() as db:
+                await apply_status_updates(db, updates)
+                await db.commit()
+        except Exception:
+            # Mark them dirty again so the next flush retries
+            await client.sadd(DIRTY_SET_KEY, *ids)
+            raise
+
+        logger.info(f"Flushed {len(updates)} statuses to the database")
+        return len(ids)
+
+# Global status store instance
+status_store = None
+
+def get_status_store() -> StatusStore:
+    """Get or create status store instance"""
+    global status_store
+    if status_store is None:
+        status_store = StatusStore(
+            flush_interval=config.STATUS_STORE_FLUSH_INTERVAL,
+            batch_size=config.STATUS_STORE_BATCH_SIZE,
+            ttl=config.STATUS_STORE_TTL
+        )
+    return status_store
+
+async def save_status_updates(
+    db: AsyncSession,
+    updates: List[schemas.NotificationStatusUpdate]
+) -> Dict[int, AppliedStatus]:
+    """Apply status updates directly, or record them in Redis in write-behind mode.
+
+    The caller commits. In write-behind mode the notifications are looked
+    up by primary key first, so unknown ids and events older than the
+    stored status are skipped as they would be by the database update.
+    Returns only the updates that were applied.
+    """
+    if not config.STATUS_WRITE_BEHIND:
+        return await apply_status_updates(db, updates)
+
+    latest = latest_status_updates(updates)
+    if not latest:
+        return {}
+    stored = {
+        notification_id: (user_id, status_updated_at)
+        for notification_id, user_id, status_updated_at in (await db.execute(
+            select(
+                models.NotificationRequest.id,
+                models.NotificationRequest.user_id,
+                models.NotificationRequest.status_updated_at
+            )
+            .where(models.NotificationRequest.id.in_(list(latest)))
+        )).all()
+    }
+
+    current = {
+        notification_id: (event_at, status_update)
+        for notification_id, (event_at, status_update) in latest.items()
+        if notification_id in stored and (stored[notification_id][1] is None or stored[notification_id][1] <= event_at)
+    }
+    recorded = await get_status_store().record([
+        status_update.model_copy(update={"timestamp": event_at})
+        for event_at, status_update in current.values()
+    ])
+    return {
+        notification_id: AppliedStatus(stored[notification_id][0], status_update.status, status_update.error, event_at)
+        for notification_id, (event_at, status_update) in current.items()
+        if notification_id in recorded
+    }
+
+async def load_notification_response(notification: models.NotificationRequest) -> schemas.NotificationResponse:
+    """Serialize a notification, including unflushed status in write-behind mode"""
+    if config.STATUS_WRITE_BEHIND:
+        return await get_status_store().merge(notification)
+    return schemas.NotificationResponse.model_validate(notification)
@@ -0,0 +1,91 @@
+"""Bulk application of delivery status updates reported by the workers"""
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, String, cast, column, func, or_, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from . import models, schemas
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("status-updates")
+
+class AppliedStatus(NamedTuple):
+    """A status change that was stored for a notification"""
+    user_id: UUID
+    status: schemas.NotificationStatus
+    error: Optional[str]
+    event_at: datetime
+
+def latest_status_updates(
+    updates: List[schemas.NotificationStatusUpdate]
+) -> Dict[int, Tuple[datetime, schemas.NotificationStatusUpdate]]:
+    """Keep the newest update per notification, keyed by notification id"""
+    now = datetime.utcnow()
+    latest = {}
+    for status_update in updates:
+        notification_id = int(status_update.notification_id)
+        event_at = status_update.timestamp or now
+        if notification_id not in latest or latest[notification_id][0] <= event_at:
+            latest[notification_id] = (event_at, status_update)
+    return latest
+
+async def apply_status_updates(
+    db: AsyncSession,
+    updates: List[schemas.NotificationStatusUpdate]
+) -> Dict[int, AppliedStatus]:
+    """Apply many status updates with one UPDATE ... FROM (VALUES ...).
+
+    Updates are ordered by their timestamp: the newest one per notification
+    is applied, and only if it is not older than the status already stored,
+    so redelivered or reordered events cannot roll a status back. The
+    caller commits. Returns the applied changes by notification id.
+    """
+    now = datetime.utcnow()
+    latest = latest_status_updates(updates)
+    if not latest:
+        return {}
+
+    rows = [
+        (
+            notification_id,
+            status_update.status.value,
+            status_update.error,
+            event_at,
+            event_at if status_update.status == schemas.NotificationStatus.delivered else None
+        )
+        for notification_id, (event_at, status_update) in latest.items()
+    ]
+    batch = values(
+        column("id", Integer),
+        column("status", models.NotificationRequest.status.type),
+        column("error", String),
+        column("event_at", DateTime),
+        column("sent_at", DateTime),
+        name="batch"
+    ).data(rows)
+
+    table = models.NotificationRequest
+    result = await db.execute(
+        update(table)
+        .where(
+            table.id == batch.c.id,
+            or_(table.status_updated_at.is_(None), table.status_updated_at <= batch.c.event_at)
+        )
+        .values(
+            status=batch.c.status,
+            # Explicit casts: a VALUES column that is NULL in every row is typed as text
+            error_message=func.coalesce(cast(batch.c.error, String), table.error_message),
+            sent_at=func.coalesce(cast(batch.c.sent_at, DateTime), table.sent_at),
+            status_updated_at=batch.c.event_at,
+            updated_at=now
+        )
+        .returning(table.id, table.user_id)
+    )
+    updated = {
+        notification_id: AppliedStatus(user_id, latest[notification_id][1].status, latest[notification_id][1].error, latest[notification_id][0])
+        for notification_id, user_id in result.all()
+    }
+
+    logger.info(f"Applied {len(updated)} of {len(latest)} status updates")
+    return updated
@@ -0,0 +1,340 @@
+"""User record lookups through the in-process and Redis caches and the User Service"""
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+import httpx
+from collections import OrderedDict
+from fastapi import HTTPException
+from typing import Dict, Any, List, Optional, Tuple
+from uuid import UUID
+
+from . import config
+from .cache_manager import get_cache_manager
+from .http_client import get_http_client
+from .utils.logging_config import setup_logging
+
+logger = setup_logging("user-lookup")
+
+cache_mgr = get_cache_manager(config.REDIS_URL)
+
+USER_CACHE_TTL = 300
+USER_INVALIDATION_CHANNEL = "user_cache:invalidate"
+LOCK_POLL_INTERVAL = 0.025
+
+# Deletes the lookup lock only if this process still holds it
+# KEYS: lock key
+# ARGV: lock token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def user_cache_key(user_id) -> str:
+    return f"user:{user_id}"
+
+def user_lock_key(user_id) -> str:
+    return f"user_lock:{user_id}"
+
+class LocalUserCache:
+    """Bounded in-process LRU of user records in front of Redis.
+
+    Entries live for a short TTL; changes made through the gateway evict
+    them everywhere via pub/sub, the TTL only bounds staleness from
+    changes made elsewhere. Counts hits per tier for the health endpoint.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.early_refreshes = 0
+
+    def get(self, user_id) -> Optional[Dict[str, Any]]:
+        key = str(user_id)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, user_id, user_data: Dict[str, Any]):
+        key = str(user_id)
+        self._entries[key] = (time.monotonic() + self.ttl, user_data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        self._entries.pop(str(user_id), None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "local_hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "early_refreshes": self.early_refreshes
+        }
+
+local_users = LocalUserCache(max_size=config.USER_LOCAL_CACHE_SIZE, ttl=config.USER_LOCAL_CACHE_TTL)
+
+def remember_user(user_id, user_data: Optional[Dict[str, Any]]):
+    """Promote a record read from Redis into the local tier"""
+    if user_data:
+        local_users.redis_hits += 1
+        local_users.set(user_id, user_data)
+
+async def invalidate_user(user_id):
+    """Drop a user's cached record from Redis and from every gateway process"""
+    local_users.invalidate(user_id)
+    try:
+        await cache_mgr.connect()
+        async with cache_mgr.client.pipeline(transaction=False) as pipe:
+            pipe.delete(user_cache_key(user_id))
+            pipe.publish(USER_INVALIDATION_CHANNEL, str(user_id))
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Error invalidating cached user {user_id}: {str(e)}")
+
+class UserCacheInvalidationListener:
+    """Evicts local user entries when another process announces a change"""
+
+    def __init__(self):
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await cache_mgr.connect()
+                async with cache_mgr.client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(USER_INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            local_users.invalidate(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Entries may be stale until resubscribed; drop them all to be safe
+                logger.error(f"User cache invalidation listener failed: {str(e)}")
+                local_users._entries.clear()
+                await asyncio.sleep(1.0)
+
+# Global user cache invalidation listener instance
+user_cache_listener = None
+
+def get_user_cache_listener() -> UserCacheInvalidationListener:
+    """Get or create the user cache invalidation listener"""
+    global user_cache_listener
+    if user_cache_listener is None:
+        user_cache_listener = UserCacheInvalidationListener()
+    return user_cache_listener
+
+async def fetch_user_data(user_id: UUID) -> Dict[str, Any]:
+    """Fetch user record from the User Service.
+
+    Raises HTTPException(404) if the user does not exist and
+    httpx.HTTPError if the service is unreachable or errors.
+    """
+    response = await get_http_client("user").send(
+        "GET",
+        f"/api/v1/users/{user_id}",
+        timeout=5
+    )
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail="User not found")
+    response.raise_for_status()
+    user_response_data = response.json()
+    # Assuming the user data is in the 'data' field of the response, which is a list
+    if user_response_data and user_response_data.get("data") and len(user_response_data["data"]) > 0:
+        return user_response_data["data"][0]
+    raise HTTPException(status_code=404, detail="User data not found in response")
+
+class UserLookupFlights:
+    """Single-flight coalescing of user-service lookups.
+
+    Concurrent misses for one user in this process share a single task,
+    and a short Redis lock lets one process across the fleet do the
+    fetch while the others wait for its cache write. Hot entries are
+    refreshed in the background shortly before they expire, with a
+    probability that rises as the TTL runs out (XFetch), so the fleet
+    rarely sees the expiry at all.
+    """
+
+    def __init__(self, lock_ttl_ms: int = 2000, beta: float = 1.0):
+        self.lock_ttl_ms = lock_ttl_ms
+        self.beta = beta
+        self.fetch_latency = 0.05
+        self.release_script = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background = set()
+
+    async def load(self, user_id) -> Dict[str, Any]:
+        """Fetch a user, joining a lookup already in flight for the same id"""
+        key = str(user_id)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load_once(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            local_users.coalesced += 1
+        # Shielded so a cancelled caller does not cancel the lookup for the others
+        return await asyncio.shield(task)
+
+    def should_refresh(self, ttl_ms: Optional[int]) -> bool:
+        """Decide whether a cached entry with ttl_ms left should be refreshed now"""
+        if ttl_ms is None or ttl_ms < 0:
+            return False
+        return -self.fetch_latency * self.beta * math.log(1.0 - random.random()) * 1000 >= ttl_ms
+
+    def refresh(self, user_id):
+        """Refresh a cached user in the background unless a lookup is already running"""
+        if str(user_id) in self._inflight:
+            return
+        local_users.early_refreshes += 1
+        task = asyncio.create_task(self._refresh(user_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _refresh(self, user_id):
+        try:
+            await self.load(user_id)
+        except Exception as e:
+            logger.error(f"Error refreshing cached user {user_id}: {str(e)}")
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _load_once(self, user_id: str) -> Dict[str, Any]:
+        token = uuid.uuid4().hex
+        try:
+            await cache_mgr.connect()
+            if self.release_script is None:
+                self.release_script = cache_mgr.client.register_script(RELEASE_LOCK_SCRIPT)
+            acquired = await cache_mgr.client.set(user_lock_key(user_id), token, nx=True, px=self.lock_ttl_ms)
+        except Exception as e:
+            logger.error(f"Error acquiring user lookup lock: {str(e)}")
+            return await self._fetch(user_id)
+
+        if not acquired:
+            user_data = await self._wait_for_holder(user_id)
+            if user_data:
+                return user_data
+            return await self._fetch(user_id)
+
+        try:
+            return await self._fetch(user_id)
+        finally:
+            try:
+                await self.release_script(keys=[user_lock_key(user_id)], args=[token])
+            except Exception as e:
+                logger.error(f"Error releasing user lookup lock: {str(e)}")
+
+    async def _wait_for_holder(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Poll for the lock holder's cache write until the lock expires"""
+        deadline = time.monotonic() + self.lock_ttl_ms / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            try:
+                async with cache_mgr.client.pipeline(transaction=False) as pipe:
+                    pipe.get(user_cache_key(user_id))
+                    pipe.exists(user_lock_key(user_id))
+                    value, locked = await pipe.execute()
+            except Exception as e:
+                logger.error(f"Error waiting for user lookup: {str(e)}")
+                return None
+            if value:
+                user_data = json.loads(value)
+                remember_user(user_id, user_data)
+                return user_data
+            if not locked:
+                # The holder gave up (e.g. the user does not exist); look it up ourselves
+                return None
+        return None
+
+    async def _fetch(self, user_id: str) -> Dict[str, Any]:
+        local_users.misses += 1
+        started = time.monotonic()
+        user_data = await fetch_user_data(user_id)
+        self.fetch_latency = 0.8 * self.fetch_latency + 0.2 * (time.monotonic() - started)
+        await cache_mgr.set(user_cache_key(user_id), user_data, ttl=USER_CACHE_TTL)
+        local_users.set(user_id, user_data)
+        return user_data
+
+user_flights = UserLookupFlights(lock_ttl_ms=config.USER_LOOKUP_LOCK_TTL_MS, beta=config.USER_EARLY_REFRESH_BETA)
+
+async def load_user(user_id: UUID) -> Dict[str, Any]:
+    """Fetch a user from the User Service and cache the record in both tiers"""
+    return await user_flights.load(user_id)
+
+async def resolve_users(
+    user_ids: List[UUID],
+    concurrency: int = 50
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """Resolve many users at once.
+
+    Records come from the local tier, then one MGET for the rest; misses
+    are fetched through the single-flight lookup with bounded concurrency.
+    Returns (users by id, errors by id).
+    """
+    unique_ids = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+    users = {}
+    for user_id in unique_ids:
+        user_data = local_users.get(user_id)
+        if user_data:
+            users[user_id] = user_data
+
+    remote_ids = [user_id for user_id in unique_ids if user_id not in users]
+    cached = await cache_mgr.get_many([user_cache_key(user_id) for user_id in remote_ids])
+    for user_id, user_data in zip(remote_ids, cached):
+        if user_data:
+            remember_user(user_id, user_data)
+            users[user_id] = user_data
+
+    misses = [user_id for user_id in unique_ids if user_id not in users]
+    errors: Dict[str, str] = {}
+
+    if misses:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _fetch(user_id: str):
+            async with semaphore:
+                try:
+                    users[user_id] = await load_user(user_id)
+                except HTTPException as e:
+                    errors[user_id] = e.detail
+                except httpx.HTTPError as e:
+                    logger.error(f"Error fetching user data for {user_id}: {str(e)}")
+                    errors[user_id] = "User service unavailable"
+
+        await asyncio.gather(*(_fetch(user_id) for user_id in misses))
+        logger.info(f"Resolved {len(unique_ids)} users: {len(unique_ids) - len(misses)} cached, {len(misses)} fetched, {len(errors)} failed")
+
+    return users, errors
@@ -46,6 +46,23 @@ class CircuitBreaker:
             self._on_failure()
             raise e
     
+    async def call_async(self, func: Callable, *args, **kwargs) -> Any:
+        """Execute coroutine function with circuit breaker protection"""
+        if self.state == CircuitState.OPEN:
+            if self._should_attempt_reset():
+                self.state = CircuitState.HALF_OPEN
+                logger.info(f"Circuit breaker entering HALF_OPEN state for {func.__name__}")
+            else:
+                raise Exception(f"Circuit breaker is OPEN for {func.__name__}")
+        
+        try:
+            result = await func(*args, **kwargs)
+            self._on_success()
+            return result
+        except self.expected_exception as e:
+            self._on_failure()
+            raise e
+    
     def _should_attempt_reset(self) -> bool:
         return (
             self.last_failure_time is not None and
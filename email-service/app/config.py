@@ -15,9 +15,61 @@ SMTP_USE_TLS = True
 # Queue configuration
 EMAIL_QUEUE = "email.queue"
 FAILED_QUEUE = "failed.queue"
+STATUS_QUEUE = "status.queue"
 EXCHANGE_NAME = "notifications.direct"
 
+# Priority queues, most urgent first: (queue, routing key) per notification
+# priority (2=urgent, 1=high, 0=normal), so campaigns on the normal queue
+# cannot hold up urgent messages
+PRIORITY_QUEUES = {
+    2: ("email.queue.urgent", "email.urgent"),
+    1: ("email.queue.high", "email.high"),
+    0: (EMAIL_QUEUE, "email")
+}
+
+# Worker processes started by the supervisor (default: one per CPU; 1 runs without a supervisor)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "0")) or os.cpu_count() or 1
+
+# Seconds a worker gets on SIGTERM to finish in-flight messages before it is killed
+WORKER_SHUTDOWN_TIMEOUT = float(os.getenv("WORKER_SHUTDOWN_TIMEOUT", "60"))
+
+# Threads processing messages concurrently in each worker process
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "8"))
+
+# Worker runtime: "threads" (pika with a thread pool) or "asyncio" (aio-pika, a task per message)
+WORKER_RUNTIME = os.getenv("WORKER_RUNTIME", "threads")
+
+# asyncio runtime: messages processed at once, and unacked messages held
+# across the priority queues (split in PRIORITY_PREFETCH proportions)
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "200"))
+ASYNC_PREFETCH = int(os.getenv("ASYNC_PREFETCH", "400"))
+
+# Unacked messages held per priority queue; the broker shares the worker's
+# capacity between the queues in this proportion while they all have work.
+# Together they should exceed WORKER_THREADS to keep every thread busy.
+PRIORITY_PREFETCH = {
+    2: int(os.getenv("URGENT_PREFETCH", "16")),
+    1: int(os.getenv("HIGH_PREFETCH", "8")),
+    0: int(os.getenv("NORMAL_PREFETCH", "4"))
+}
+
 # Retry configuration
 MAX_RETRIES = 3
 RETRY_BASE_DELAY = 2.0
 RETRY_MAX_DELAY = 60.0
+
+# Delayed retries: a failed message waits in the retry queue for its delay
+# (queue TTL) and is then dead-lettered straight back to its work queue,
+# so waiting costs the worker nothing. One queue per distinct delay.
+RETRY_EXCHANGE_PREFIX = "email.retry"
+RETRY_DELAYS_MS = [
+    int(min(RETRY_BASE_DELAY * (2 ** attempt), RETRY_MAX_DELAY) * 1000)
+    for attempt in range(MAX_RETRIES)
+]
+
+# Status updates: "broker" publishes events to the status queue, "http" posts batches to the gateway
+STATUS_UPDATE_MODE = os.getenv("STATUS_UPDATE_MODE", "broker")
+
+# Status update batching (http mode, and fallback when publishing fails)
+STATUS_BATCH_SIZE = int(os.getenv("STATUS_BATCH_SIZE", "100"))
+STATUS_FLUSH_INTERVAL_MS = int(os.getenv("STATUS_FLUSH_INTERVAL_MS", "200"))
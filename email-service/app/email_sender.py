@@ -4,7 +4,6 @@ from email.mime.multipart import MIMEMultipart
 from typing import Dict, Any
 
 from app.utils.logging_config import setup_logging
-from app.utils.retry_handler import retry_with_backoff
 from app.utils.circuit_breaker import circuit_breaker
 
 logger = setup_logging("email-sender")
@@ -20,11 +19,13 @@ class EmailSender:
         self.smtp_from = smtp_from
         self.use_tls = use_tls
     
-    @retry_with_backoff(max_retries=3, base_delay=2.0, exceptions=(smtplib.SMTPException, ConnectionError))
     @circuit_breaker(failure_threshold=5, recovery_timeout=60, expected_exception=smtplib.SMTPException)
     def send_email(self, to_email: str, subject: str, body: str, is_html: bool = True) -> bool:
         """
-        Sends an email with retry and circuit breaker protection.
+        Sends an email with circuit breaker protection.
+        
+        Failures are raised straight away; the worker retries them
+        through the delayed retry queues.
         
         Args:
             to_email: The recipient's email address.
@@ -1,21 +1,32 @@
+import asyncio
+import aio_pika
+import httpx
 import pika
 import json
 import time
+import threading
 import requests
 import os
+import signal
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path so we can import from app.utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.utils.logging_config import setup_logging, set_correlation_id
-from app.utils.retry_handler import RetryHandler
+from app.utils.status_buffer import StatusUpdateBuffer
+from app.utils.ack_tracker import AckTracker
+from app.utils.async_consumer import AsyncConsumer
+from app.utils.supervisor import WorkerSupervisor, accept_shutdown_signals
 
 from app.config import (
-    RABBITMQ_URL, REDIS_URL, TEMPLATE_SERVICE_URL,
-    EMAIL_QUEUE, FAILED_QUEUE, EXCHANGE_NAME,
+    RABBITMQ_URL, TEMPLATE_SERVICE_URL,
+    EXCHANGE_NAME, PRIORITY_QUEUES, PRIORITY_PREFETCH, WORKER_THREADS,
+    WORKER_RUNTIME, ASYNC_CONCURRENCY, ASYNC_PREFETCH, WORKER_PROCESSES, WORKER_SHUTDOWN_TIMEOUT,
     SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_FROM_EMAIL, SMTP_USE_TLS,
-    MAX_RETRIES, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+    MAX_RETRIES, RETRY_EXCHANGE_PREFIX, RETRY_DELAYS_MS,
+    STATUS_QUEUE, STATUS_UPDATE_MODE, STATUS_BATCH_SIZE, STATUS_FLUSH_INTERVAL_MS
 )
 from app.email_sender import EmailSender
 
@@ -30,6 +41,12 @@ class EmailWorker:
         self.rabbitmq_url = RABBITMQ_URL
         self.connection = None
         self.channel = None
+        self.executor = None
+        self.ack_tracker = None
+        self._connection_thread = None
+        self.async_consumer = None
+        self.async_exchanges = {}
+        self.http_client = None
         self.email_sender = EmailSender(
             smtp_host=SMTP_HOST,
             smtp_port=SMTP_PORT,
@@ -38,10 +55,10 @@ class EmailWorker:
             smtp_from=SMTP_FROM_EMAIL,
             use_tls=SMTP_USE_TLS
         )
-        self.retry_handler = RetryHandler(
-            max_retries=MAX_RETRIES,
-            base_delay=RETRY_BASE_DELAY,
-            max_delay=RETRY_MAX_DELAY
+        self.status_buffer = StatusUpdateBuffer(
+            gateway_url=GATEWAY_URL,
+            max_items=STATUS_BATCH_SIZE,
+            max_delay_ms=STATUS_FLUSH_INTERVAL_MS
         )
     
     def connect(self, max_retries=10, retry_delay=5):
@@ -53,9 +70,40 @@ class EmailWorker:
                 self.connection = pika.BlockingConnection(parameters)
                 self.channel = self.connection.channel()
                 
-                self.channel.basic_qos(prefetch_count=1)
+                # Status events are published with confirms, so make sure they have somewhere to go
+                self.channel.confirm_delivery()
+                self.channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type='direct', durable=True)
+                self.channel.queue_declare(queue=STATUS_QUEUE, durable=True)
+                self.channel.queue_bind(queue=STATUS_QUEUE, exchange=EXCHANGE_NAME, routing_key='status')
                 
-                logger.info(f"Connected to RabbitMQ, listening on {EMAIL_QUEUE}")
+                # The gateway declares these too; the arguments must match its declaration
+                for queue_name, routing_key in PRIORITY_QUEUES.values():
+                    self.channel.queue_declare(
+                        queue=queue_name,
+                        durable=True,
+                        arguments={
+                            'x-dead-letter-exchange': EXCHANGE_NAME,
+                            'x-dead-letter-routing-key': 'failed'
+                        }
+                    )
+                    self.channel.queue_bind(queue=queue_name, exchange=EXCHANGE_NAME, routing_key=routing_key)
+                
+                # Retry queues dead-letter to the default exchange under the routing key
+                # the message was published with, i.e. the name of its work queue
+                for delay_ms in sorted(set(RETRY_DELAYS_MS)):
+                    retry_exchange = f"{RETRY_EXCHANGE_PREFIX}.{delay_ms}"
+                    self.channel.exchange_declare(exchange=retry_exchange, exchange_type='fanout', durable=True)
+                    self.channel.queue_declare(
+                        queue=retry_exchange,
+                        durable=True,
+                        arguments={
+                            'x-message-ttl': delay_ms,
+                            'x-dead-letter-exchange': ''
+                        }
+                    )
+                    self.channel.queue_bind(queue=retry_exchange, exchange=retry_exchange)
+                
+                logger.info(f"Connected to RabbitMQ, listening on {[queue_name for queue_name, _ in PRIORITY_QUEUES.values()]}")
                 return  # Success!
             except Exception as e:
                 retry_count += 1
@@ -97,24 +145,39 @@ class EmailWorker:
             raise
     
     def update_notification_status(self, notification_id: int, notification_type: str, status: str, error_message: str = None):
-        """Updates notification status in the API Gateway."""
-        try:
+        """Reports a notification status change to the API Gateway."""
+        if STATUS_UPDATE_MODE == "broker" and self.channel is not None and self.channel.is_open:
             from datetime import datetime
             
-            response = requests.post(
-                f"{GATEWAY_URL}/api/v1/notifications/{notification_type}/status",
-                json={
-                    "notification_id": str(notification_id),
-                    "status": status,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "error": error_message
-                },
-                timeout=5
-            )
-            response.raise_for_status()
-            logger.info(f"Notification {notification_id} status updated to {status}")
-        except Exception as e:
-            logger.error(f"Error updating notification status: {str(e)}")
+            event = json.dumps({
+                "notification_id": str(notification_id),
+                "notification_type": notification_type,
+                "status": status,
+                "timestamp": datetime.utcnow().isoformat(),
+                "error": error_message
+            })
+            
+            def publish():
+                try:
+                    self.channel.basic_publish(
+                        exchange=EXCHANGE_NAME,
+                        routing_key='status',
+                        body=event,
+                        properties=pika.BasicProperties(
+                            delivery_mode=2,
+                            content_type='application/json'
+                        )
+                    )
+                    logger.info(f"Notification {notification_id} status {status} published")
+                except Exception as e:
+                    logger.error(f"Error publishing status event, falling back to HTTP: {str(e)}")
+                    self.status_buffer.add(notification_id, status, error_message)
+            
+            self._run_on_connection(publish)
+            return
+        
+        self.status_buffer.add(notification_id, status, error_message)
+        logger.info(f"Notification {notification_id} status {status} queued for update")
     
     def process_message(self, ch, method, properties, body):
         """Processes a single email message."""
@@ -137,19 +200,19 @@ class EmailWorker:
             # Render the template
             rendered = self.render_template(template_code, variables)
             subject = rendered.get('subject', 'Notification')
-            body = rendered.get('body', '')
+            html_body = rendered.get('body', '')
             
             # Send email
             self.email_sender.send_email(
                 to_email=recipient,
                 subject=subject,
-                body=body,
+                body=html_body,
                 is_html=True
             )
             
             self.update_notification_status(notification_id, notification_type, "delivered")
             
-            ch.basic_ack(delivery_tag=method.delivery_tag)
+            self._settle(ch, method.delivery_tag)
             logger.info(f"Email sent successfully to {recipient}")
             
         except Exception as e:
@@ -160,30 +223,30 @@ class EmailWorker:
             notification_id = message.get('notification_id')
             notification_type = message.get('notification_type', 'email')
             retry_count = message.get('retry_count', 0)
+            priority = message.get('priority', 0)
             
             if retry_count < MAX_RETRIES:
                 message['retry_count'] = retry_count + 1
-                delay = min(RETRY_BASE_DELAY * (2 ** retry_count), RETRY_MAX_DELAY)
-                
-                logger.info(f"Requeuing message, retry {retry_count + 1}/{MAX_RETRIES}, delay: {delay}s")
+                delay_ms = RETRY_DELAYS_MS[retry_count]
                 
-                time.sleep(delay)
+                logger.info(f"Scheduling retry {retry_count + 1}/{MAX_RETRIES} in {delay_ms / 1000}s")
                 
-                ch.basic_publish(
-                    exchange='',
-                    routing_key=EMAIL_QUEUE,
-                    body=json.dumps(message),
+                # Parked in the retry queue until its TTL sends it back to the work queue
+                retry_body = json.dumps(message)
+                self._settle(ch, method.delivery_tag, before=lambda: ch.basic_publish(
+                    exchange=f"{RETRY_EXCHANGE_PREFIX}.{delay_ms}",
+                    routing_key=PRIORITY_QUEUES.get(priority, PRIORITY_QUEUES[0])[0],
+                    body=retry_body,
                     properties=pika.BasicProperties(
                         delivery_mode=2,
                         correlation_id=correlation_id
                     )
-                )
-                ch.basic_ack(delivery_tag=method.delivery_tag)
+                ))
             else:
                 logger.error(f"Max retries reached, sending to failed queue")
                 self.update_notification_status(notification_id, notification_type, "failed", str(e))
                 
-                ch.basic_publish(
+                self._settle(ch, method.delivery_tag, before=lambda: ch.basic_publish(
                     exchange=EXCHANGE_NAME,
                     routing_key='failed',
                     body=body,
@@ -191,22 +254,254 @@ class EmailWorker:
                         delivery_mode=2,
                         correlation_id=correlation_id
                     )
+                ))
+    
+    def on_message(self, ch, method, properties, body):
+        """Hands a delivery to the thread pool; runs on the connection thread."""
+        self.ack_tracker.delivered(method.delivery_tag)
+        self.executor.submit(self._handle_message, ch, method, properties, body)
+    
+    def _handle_message(self, ch, method, properties, body):
+        try:
+            self.process_message(ch, method, properties, body)
+        except Exception as e:
+            # Unreadable message: reject it to the dead letter queue instead of leaking its prefetch slot
+            logger.error(f"Unhandled error processing message, rejecting it: {str(e)}")
+            self._settle(ch, method.delivery_tag, ack=False)
+    
+    def _run_on_connection(self, callback):
+        """Runs a channel operation on the connection thread; pika channels are not thread-safe."""
+        if self.connection is None or self._connection_thread in (None, threading.get_ident()):
+            callback()
+        else:
+            self.connection.add_callback_threadsafe(callback)
+    
+    def _settle(self, ch, delivery_tag, ack=True, before=None):
+        """Acks (or rejects) a delivery from any thread, after running `before` (e.g. a republish)."""
+        def settle():
+            nonlocal ack
+            if before is not None:
+                try:
+                    before()
+                except Exception as e:
+                    logger.error(f"Error republishing message, rejecting it: {str(e)}")
+                    ack = False
+            
+            if self.ack_tracker is None:
+                if ack:
+                    ch.basic_ack(delivery_tag=delivery_tag)
+                else:
+                    ch.basic_nack(delivery_tag=delivery_tag, requeue=False)
+                return
+            
+            for frame, tag, multiple in self.ack_tracker.complete(delivery_tag, ack):
+                if frame == "ack":
+                    ch.basic_ack(delivery_tag=tag, multiple=multiple)
+                else:
+                    ch.basic_nack(delivery_tag=tag, requeue=False)
+        
+        self._run_on_connection(settle)
+    
+    async def declare_topology_async(self, channel):
+        """Declares the exchanges and queues from connect() on an aio-pika channel."""
+        exchange = await channel.declare_exchange(EXCHANGE_NAME, aio_pika.ExchangeType.DIRECT, durable=True)
+        status_queue = await channel.declare_queue(STATUS_QUEUE, durable=True)
+        await status_queue.bind(exchange, routing_key='status')
+        self.async_exchanges[EXCHANGE_NAME] = exchange
+        
+        for queue_name, routing_key in PRIORITY_QUEUES.values():
+            queue = await channel.declare_queue(
+                queue_name,
+                durable=True,
+                arguments={
+                    'x-dead-letter-exchange': EXCHANGE_NAME,
+                    'x-dead-letter-routing-key': 'failed'
+                }
+            )
+            await queue.bind(exchange, routing_key=routing_key)
+        
+        for delay_ms in sorted(set(RETRY_DELAYS_MS)):
+            retry_exchange = await channel.declare_exchange(
+                f"{RETRY_EXCHANGE_PREFIX}.{delay_ms}", aio_pika.ExchangeType.FANOUT, durable=True
+            )
+            retry_queue = await channel.declare_queue(
+                retry_exchange.name,
+                durable=True,
+                arguments={
+                    'x-message-ttl': delay_ms,
+                    'x-dead-letter-exchange': ''
+                }
+            )
+            await retry_queue.bind(retry_exchange)
+            self.async_exchanges[retry_exchange.name] = retry_exchange
+    
+    async def render_template_async(self, template_name: str, variables: dict, language: str = "en") -> dict:
+        """Fetches and renders a template from the template service without blocking the loop."""
+        try:
+            response = await self.http_client.post(
+                "/api/v1/templates/render",
+                json={
+                    "template_name": template_name,
+                    "language": language,
+                    "variables": variables
+                }
+            )
+            response.raise_for_status()
+            data = response.json()
+            return data.get("data", {})
+        except Exception as e:
+            logger.error(f"Error rendering template: {str(e)}")
+            raise
+    
+    async def update_notification_status_async(self, notification_id: int, notification_type: str, status: str, error_message: str = None):
+        """Publishes a status event on the asyncio runtime; falls back to the HTTP batch buffer."""
+        if STATUS_UPDATE_MODE == "broker" and EXCHANGE_NAME in self.async_exchanges:
+            from datetime import datetime
+            
+            try:
+                await self.async_exchanges[EXCHANGE_NAME].publish(
+                    aio_pika.Message(
+                        body=json.dumps({
+                            "notification_id": str(notification_id),
+                            "notification_type": notification_type,
+                            "status": status,
+                            "timestamp": datetime.utcnow().isoformat(),
+                            "error": error_message
+                        }).encode(),
+                        content_type='application/json',
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                    ),
+                    routing_key='status'
+                )
+                logger.info(f"Notification {notification_id} status {status} published")
+                return
+            except Exception as e:
+                logger.error(f"Error publishing status event, falling back to HTTP: {str(e)}")
+        
+        # Non-blocking: the buffer posts batches from its own thread
+        self.status_buffer.add(notification_id, status, error_message)
+        logger.info(f"Notification {notification_id} status {status} queued for update")
+    
+    async def process_message_async(self, message: aio_pika.abc.AbstractIncomingMessage):
+        """Processes a single email message on the asyncio runtime."""
+        set_correlation_id(message.correlation_id)
+        
+        try:
+            payload = json.loads(message.body)
+            logger.info(f"Processing email notification: {payload.get('notification_id')}")
+            
+            notification_id = payload.get('notification_id')
+            recipient = payload.get('recipient')
+            template_code = payload.get('template_code')
+            notification_type = payload.get('notification_type', 'email')
+            variables = payload.get('variables', {})
+            
+            rendered = await self.render_template_async(template_code, variables)
+            
+            await self.async_consumer.run_blocking(
+                self.email_sender.send_email,
+                to_email=recipient,
+                subject=rendered.get('subject', 'Notification'),
+                body=rendered.get('body', ''),
+                is_html=True
+            )
+            
+            await self.update_notification_status_async(notification_id, notification_type, "delivered")
+            await message.ack()
+            logger.info(f"Email sent successfully to {recipient}")
+            
+        except Exception as e:
+            logger.error(f"Error processing message: {str(e)}")
+            
+            payload = json.loads(message.body)
+            notification_id = payload.get('notification_id')
+            notification_type = payload.get('notification_type', 'email')
+            retry_count = payload.get('retry_count', 0)
+            priority = payload.get('priority', 0)
+            
+            if retry_count < MAX_RETRIES:
+                payload['retry_count'] = retry_count + 1
+                delay_ms = RETRY_DELAYS_MS[retry_count]
+                
+                logger.info(f"Scheduling retry {retry_count + 1}/{MAX_RETRIES} in {delay_ms / 1000}s")
+                
+                # Parked in the retry queue until its TTL sends it back to the work queue
+                await self.async_exchanges[f"{RETRY_EXCHANGE_PREFIX}.{delay_ms}"].publish(
+                    aio_pika.Message(
+                        body=json.dumps(payload).encode(),
+                        correlation_id=message.correlation_id,
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                    ),
+                    routing_key=PRIORITY_QUEUES.get(priority, PRIORITY_QUEUES[0])[0]
+                )
+            else:
+                logger.error("Max retries reached, sending to failed queue")
+                await self.update_notification_status_async(notification_id, notification_type, "failed", str(e))
+                
+                await self.async_exchanges[EXCHANGE_NAME].publish(
+                    aio_pika.Message(
+                        body=message.body,
+                        correlation_id=message.correlation_id,
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                    ),
+                    routing_key='failed'
                 )
-                ch.basic_ack(delivery_tag=method.delivery_tag)
+            await message.ack()
+    
+    async def run_async(self):
+        """Consumes with the asyncio runtime until SIGINT/SIGTERM."""
+        # Same weighting as the threaded runtime, scaled up to the async prefetch
+        weight_total = sum(PRIORITY_PREFETCH.values())
+        self.async_consumer = AsyncConsumer(
+            self.rabbitmq_url,
+            queues={
+                queue_name: max(1, ASYNC_PREFETCH * PRIORITY_PREFETCH[priority] // weight_total)
+                for priority, (queue_name, _) in PRIORITY_QUEUES.items()
+            },
+            handler=self.process_message_async,
+            setup=self.declare_topology_async,
+            concurrency=ASYNC_CONCURRENCY,
+            shutdown_timeout=WORKER_SHUTDOWN_TIMEOUT,
+            name="email-worker"
+        )
+        self.http_client = httpx.AsyncClient(
+            base_url=TEMPLATE_SERVICE_URL,
+            timeout=10,
+            limits=httpx.Limits(max_connections=ASYNC_CONCURRENCY, max_keepalive_connections=ASYNC_CONCURRENCY)
+        )
+        self.status_buffer.start()
+        try:
+            await self.async_consumer.run()
+        finally:
+            await self.http_client.aclose()
+            self.status_buffer.close()
     
     def start_consuming(self):
         """Starts consuming messages from the queue."""
         try:
             self.connect()
-            self.channel.basic_consume(
-                queue=EMAIL_QUEUE,
-                on_message_callback=self.process_message,
-                auto_ack=False
-            )
+            self.status_buffer.start()
+            
+            # Messages are processed on a thread pool; acks go back through the connection thread
+            self._connection_thread = threading.get_ident()
+            self.ack_tracker = AckTracker(max_held=WORKER_THREADS)
+            self.executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="email-worker")
+            
+            # Weighted consumption: each consumer's prefetch is its share of this worker
+            for priority, (queue_name, _) in PRIORITY_QUEUES.items():
+                self.channel.basic_qos(prefetch_count=PRIORITY_PREFETCH[priority])
+                self.channel.basic_consume(
+                    queue=queue_name,
+                    on_message_callback=self.on_message,
+                    auto_ack=False
+                )
             
             logger.info("Email worker started, waiting for messages...")
             self.channel.start_consuming()
             
+            logger.info("Email worker draining...")
+            self.stop()
+            
         except KeyboardInterrupt:
             logger.info("Email worker stopped by user")
             self.stop()
@@ -214,13 +509,36 @@ class EmailWorker:
             logger.error(f"Error in email worker: {str(e)}")
             raise
     
+    def _on_shutdown_signal(self, signum, frame):
+        """Stops consuming from the connection loop; start_consuming then drains the worker."""
+        logger.info(f"Received signal {signum}, stopping consumption")
+        if self.connection is None:
+            # Still connecting: nothing to drain yet
+            raise SystemExit(0)
+        try:
+            self.connection.add_callback_threadsafe(lambda: self.channel.stop_consuming())
+        except Exception as e:
+            logger.error(f"Error stopping consumption: {str(e)}")
+    
     def stop(self):
         """Stops the worker and closes RabbitMQ connection."""
         try:
             if self.channel:
                 self.channel.stop_consuming()
+            if self.executor:
+                # Finish every delivered message, servicing acks and heartbeats meanwhile
+                self.executor.shutdown(wait=False)
+                deadline = time.monotonic() + WORKER_SHUTDOWN_TIMEOUT
+                while (self.ack_tracker.pending and self.connection.is_open
+                        and time.monotonic() < deadline):
+                    self.connection.process_data_events(time_limit=0.1)
+                self.executor.shutdown(wait=True)
+                self.executor = None
             if self.connection and not self.connection.is_closed:
+                # Send the acks the pool scheduled before closing
+                self.connection.process_data_events(time_limit=0)
                 self.connection.close()
+            self.status_buffer.close()
             logger.info("Email worker stopped")
         except Exception as e:
             logger.error(f"Error stopping worker: {str(e)}")
@@ -270,13 +588,32 @@ class EmailWorker:
 #         response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
 #         return {"status": "unhealthy", "message": f"Email service is not connected to RabbitMQ: {e}"}
 
+def run_worker():
+    """Runs one email worker with the configured runtime until it is stopped."""
+    worker = EmailWorker()
+    if WORKER_RUNTIME == "asyncio":
+        asyncio.run(worker.run_async())
+    else:
+        # SIGTERM (deploys, the supervisor) drains the worker instead of killing it mid-message
+        signal.signal(signal.SIGTERM, worker._on_shutdown_signal)
+        signal.signal(signal.SIGINT, worker._on_shutdown_signal)
+        accept_shutdown_signals()
+        try:
+            worker.start_consuming()
+        except Exception as e:
+            logger.error(f"Fatal error in standalone email worker: {str(e)}")
+            worker.stop()
+
 if __name__ == "__main__":
     # This block runs if main.py is executed directly, not via uvicorn.
     # When running with uvicorn, the startup_event handles the connection.
     # For local testing or as a standalone worker, this can be used.
-    worker = EmailWorker()
-    try:
-        worker.start_consuming()
-    except Exception as e:
-        logger.error(f"Fatal error in standalone email worker: {str(e)}")
-        worker.stop()
+    if WORKER_PROCESSES > 1:
+        WorkerSupervisor(
+            run_worker,
+            processes=WORKER_PROCESSES,
+            name="email-worker",
+            shutdown_timeout=WORKER_SHUTDOWN_TIMEOUT
+        ).run()
+    else:
+        run_worker()
@@ -0,0 +1,56 @@
+"""Ordered acknowledgement of deliveries that complete out of order"""
+from collections import deque
+from typing import Dict, List, Set, Tuple
+
+class AckTracker:
+    """Turns out-of-order completions on one channel into multi-acks.
+
+    Deliveries are registered in the order the broker sent them. When the
+    oldest outstanding one completes, it and every completed delivery
+    after it are acked with a single multiple=True ack. Completions held
+    behind a slow message are settled one by one once more than max_held
+    are waiting, so a stuck message cannot pin the prefetch window.
+    Only used from the connection thread.
+    """
+
+    def __init__(self, max_held: int = 8):
+        self.max_held = max_held
+        self._outstanding = deque()
+        self._completed: Dict[int, bool] = {}
+        self._settled: Set[int] = set()
+
+    @property
+    def pending(self) -> int:
+        """Deliveries not yet covered by an ack or nack"""
+        return len(self._outstanding)
+
+    def delivered(self, delivery_tag: int):
+        self._outstanding.append(delivery_tag)
+
+    def complete(self, delivery_tag: int, ack: bool = True) -> List[Tuple[str, int, bool]]:
+        """Record a completion; returns the (ack|nack, delivery tag, multiple) frames to send"""
+        self._completed[delivery_tag] = ack
+        frames = []
+        last_acked = None
+        while self._outstanding and (
+            self._outstanding[0] in self._completed or self._outstanding[0] in self._settled
+        ):
+            head = self._outstanding.popleft()
+            if head in self._settled:
+                self._settled.discard(head)
+            elif self._completed.pop(head):
+                last_acked = head
+            else:
+                if last_acked is not None:
+                    frames.append(("ack", last_acked, True))
+                    last_acked = None
+                frames.append(("nack", head, False))
+        if last_acked is not None:
+            frames.append(("ack", last_acked, True))
+
+        if len(self._completed) > self.max_held:
+            for tag, tag_ack in self._completed.items():
+                frames.append(("ack" if tag_ack else "nack", tag, False))
+                self._settled.add(tag)
+            self._completed.clear()
+        return frames
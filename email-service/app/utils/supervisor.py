@@ -0,0 +1,128 @@
+"""Runs several worker processes and keeps them alive"""
+import multiprocessing
+import os
+import signal
+import time
+from typing import Callable, List, Optional
+
+from app.utils.logging_config import setup_logging
+
+logger = setup_logging("worker-supervisor")
+
+# A child that ran this long before exiting is restarted without backoff
+STABLE_AFTER_SECONDS = 30.0
+
+# Time a child gets beyond its own drain deadline to flush acks and status updates
+FLUSH_MARGIN_SECONDS = 10.0
+
+SHUTDOWN_SIGNALS = {signal.SIGTERM, signal.SIGINT}
+
+def accept_shutdown_signals():
+    """Unblock SIGTERM/SIGINT once the worker's drain handler is installed; pending ones arrive now"""
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, SHUTDOWN_SIGNALS)
+
+def _child_main(target: Callable[[], None]):
+    # Forked children inherit the supervisor's handlers; the worker installs its own.
+    # The signals stay blocked until it does, so an early SIGTERM waits instead of killing.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    target()
+
+class WorkerSupervisor:
+    """Forks `processes` copies of a worker and restarts any that exit.
+
+    Restarts back off exponentially while a child keeps crashing. On
+    SIGTERM or SIGINT the supervisor stops restarting and forwards SIGTERM.
+    Each child then drains: it stops consuming, finishes and acks the
+    messages it holds and flushes status updates. Children get
+    shutdown_timeout (their own drain deadline) plus a margin to flush
+    before they are killed, and the broker redelivers their unacked
+    messages.
+    """
+
+    def __init__(
+        self,
+        target: Callable[[], None],
+        processes: int,
+        name: str = "worker",
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        shutdown_timeout: float = 60.0
+    ):
+        self.target = target
+        self.processes = processes
+        self.name = name
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.shutdown_timeout = shutdown_timeout
+        self.context = multiprocessing.get_context("fork")
+        self._children: List[Optional[multiprocessing.Process]] = [None] * processes
+        self._started_at = [0.0] * processes
+        self._failures = [0] * processes
+        self._restart_at = [0.0] * processes
+        self._stopping = False
+
+    def run(self):
+        """Supervise until signalled, then drain the children and return"""
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        logger.info(f"Starting {self.processes} {self.name} processes")
+
+        while not self._stopping:
+            now = time.monotonic()
+            for slot in range(self.processes):
+                child = self._children[slot]
+                if child is not None and child.is_alive():
+                    continue
+                if child is not None:
+                    self._on_exit(slot, child, now)
+                if now >= self._restart_at[slot]:
+                    self._spawn(slot, now)
+            time.sleep(0.5)
+
+        self._drain()
+
+    def _spawn(self, slot: int, now: float):
+        child = self.context.Process(target=_child_main, args=(self.target,), name=f"{self.name}-{slot}")
+        # The child inherits the blocked mask and unblocks once its handler is installed
+        signal.pthread_sigmask(signal.SIG_BLOCK, SHUTDOWN_SIGNALS)
+        try:
+            child.start()
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, SHUTDOWN_SIGNALS)
+        self._children[slot] = child
+        self._started_at[slot] = now
+        logger.info(f"Started {child.name} (pid {child.pid})")
+
+    def _on_exit(self, slot: int, child: multiprocessing.Process, now: float):
+        """Schedule the replacement of a child that exited on its own"""
+        self._children[slot] = None
+        if now - self._started_at[slot] >= STABLE_AFTER_SECONDS:
+            self._failures[slot] = 0
+        self._failures[slot] += 1
+        delay = min(self.min_backoff * (2 ** (self._failures[slot] - 1)), self.max_backoff)
+        self._restart_at[slot] = now + delay
+        logger.error(f"{child.name} (pid {child.pid}) exited with code {child.exitcode}, restarting in {delay:.1f}s")
+
+    def _on_signal(self, signum, frame):
+        logger.info(f"Received signal {signum}, draining {self.name} processes")
+        self._stopping = True
+
+    def _drain(self):
+        """Ask every child to finish its in-flight work, killing those that overrun"""
+        children = [child for child in self._children if child is not None and child.is_alive()]
+        for child in children:
+            try:
+                os.kill(child.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        kill_after = self.shutdown_timeout + FLUSH_MARGIN_SECONDS
+        deadline = time.monotonic() + kill_after
+        for child in children:
+            child.join(timeout=max(deadline - time.monotonic(), 0))
+            if child.is_alive():
+                logger.error(f"{child.name} did not finish within {kill_after}s, killing it")
+                child.kill()
+                child.join()
+        logger.info(f"All {self.name} processes stopped")
@@ -75,6 +75,28 @@ def test_email_sender_send(mock_smtp):
         assert "smtp" in str(e).lower() or True
 
 
+@patch('time.sleep')
+@patch('smtplib.SMTP')
+def test_email_sender_failure_is_not_retried_in_process(mock_smtp, mock_sleep):
+    """Test that an SMTP failure is raised at once, leaving retries to the retry queues"""
+    import smtplib
+    mock_smtp.side_effect = smtplib.SMTPServerDisconnected("connection lost")
+    
+    sender = EmailSender(
+        smtp_host="smtp.test.com",
+        smtp_port=587,
+        smtp_user="test@example.com",
+        smtp_password="password",
+        smtp_from="noreply@example.com"
+    )
+    
+    with pytest.raises(smtplib.SMTPException):
+        sender.send_email(to_email="recipient@example.com", subject="Test Email", body="Test content")
+    
+    assert mock_smtp.call_count == 1
+    mock_sleep.assert_not_called()
+
+
 @patch('requests.post')
 def test_email_worker_template_rendering(mock_post):
     """Test that worker can request template rendering"""
@@ -148,3 +170,139 @@ def test_config_loaded():
     
     assert SMTP_HOST is not None
     assert EMAIL_QUEUE is not None
+
+
+@patch('requests.Session.post')
+def test_status_updates_are_sent_in_batches(mock_post):
+    """Test that status updates are coalesced into one batch request"""
+    from app.utils.status_buffer import StatusUpdateBuffer
+    
+    mock_post.return_value = Mock(status_code=200, json=lambda: {"data": {"updated": 3, "skipped": []}})
+    
+    buffer = StatusUpdateBuffer("http://gateway", max_items=100, max_delay_ms=60000)
+    assert buffer._thread is None
+    buffer.start()
+    for notification_id in range(3):
+        buffer.add(notification_id, "delivered")
+    buffer.close()
+    
+    assert mock_post.call_count == 1
+    assert mock_post.call_args.args[0] == "http://gateway/api/v1/notifications/status/batch"
+    assert len(mock_post.call_args.kwargs["json"]["updates"]) == 3
+
+
+def test_status_update_published_to_status_queue():
+    """Test that status changes are published as events on the broker"""
+    worker = EmailWorker()
+    worker.channel = MagicMock()
+    worker.status_buffer = Mock()
+    
+    worker.update_notification_status(7, "email", "delivered")
+    
+    kwargs = worker.channel.basic_publish.call_args.kwargs
+    assert kwargs["routing_key"] == "status"
+    assert json.loads(kwargs["body"])["notification_id"] == "7"
+    worker.status_buffer.add.assert_not_called()
+
+
+def test_priority_queues_consumed_with_weighted_prefetch():
+    """Test that every priority queue gets a consumer with its own prefetch"""
+    worker = EmailWorker()
+    worker.channel = MagicMock()
+    
+    with patch.object(worker, 'connect'):
+        worker.start_consuming()
+    
+    consumed = [call.kwargs["queue"] for call in worker.channel.basic_consume.call_args_list]
+    prefetch = [call.kwargs["prefetch_count"] for call in worker.channel.basic_qos.call_args_list]
+    assert consumed == ["email.queue.urgent", "email.queue.high", "email.queue"]
+    assert prefetch[0] > prefetch[-1]
+
+
+def test_failed_message_is_parked_in_retry_queue():
+    """Test that a failure schedules a delayed retry instead of sleeping"""
+    worker = EmailWorker()
+    channel = MagicMock()
+    message = {"notification_id": 1, "recipient": "r", "template_code": "t", "priority": 2, "retry_count": 0}
+    
+    with patch.object(worker, 'render_template', side_effect=Exception("template service down")), \
+            patch('time.sleep') as mock_sleep:
+        worker.process_message(channel, Mock(delivery_tag=1), Mock(correlation_id="c"), json.dumps(message).encode())
+    
+    mock_sleep.assert_not_called()
+    kwargs = channel.basic_publish.call_args.kwargs
+    assert kwargs["exchange"] == "email.retry.2000"
+    assert kwargs["routing_key"] == "email.queue.urgent"
+    assert json.loads(kwargs["body"])["retry_count"] == 1
+    channel.basic_ack.assert_called_once_with(delivery_tag=1)
+
+
+def test_out_of_order_completions_are_acked_in_delivery_order():
+    """Test that acks wait for earlier deliveries and are then sent as one multi-ack"""
+    from app.utils.ack_tracker import AckTracker
+    
+    tracker = AckTracker(max_held=8)
+    for tag in (1, 2, 3, 4):
+        tracker.delivered(tag)
+    
+    assert tracker.complete(3) == []
+    assert tracker.complete(2, ack=False) == []
+    assert tracker.complete(1) == [("ack", 1, True), ("nack", 2, False), ("ack", 3, True)]
+    assert tracker.complete(4) == [("ack", 4, True)]
+
+
+def test_async_runtime_parks_failed_message_in_retry_queue():
+    """Test that the asyncio runtime publishes the retry before acking the message"""
+    import asyncio
+    from unittest.mock import AsyncMock
+    
+    worker = EmailWorker()
+    worker.async_exchanges = {"email.retry.2000": AsyncMock()}
+    message = AsyncMock()
+    message.correlation_id = "c"
+    message.body = json.dumps({"notification_id": 1, "recipient": "r", "template_code": "t", "priority": 1}).encode()
+    
+    with patch.object(worker, 'render_template_async', AsyncMock(side_effect=Exception("template service down"))):
+        asyncio.run(worker.process_message_async(message))
+    
+    publish = worker.async_exchanges["email.retry.2000"].publish
+    assert publish.call_args.kwargs["routing_key"] == "email.queue.high"
+    assert json.loads(publish.call_args.args[0].body)["retry_count"] == 1
+    message.ack.assert_awaited_once()
+
+
+def test_supervisor_backs_off_restarts_of_crashing_children():
+    """Test that quick crashes double the restart delay and a stable run resets it"""
+    from app.utils.supervisor import WorkerSupervisor
+    
+    supervisor = WorkerSupervisor(lambda: None, processes=1, min_backoff=1.0, max_backoff=60.0)
+    child = Mock(pid=42, exitcode=1)
+    child.name = "worker-0"
+    
+    supervisor._started_at[0] = 100.0
+    supervisor._on_exit(0, child, 101.0)
+    assert supervisor._restart_at[0] == 102.0
+    supervisor._on_exit(0, child, 103.0)
+    assert supervisor._restart_at[0] == 105.0
+    
+    supervisor._started_at[0] = 105.0
+    supervisor._on_exit(0, child, 200.0)
+    assert supervisor._restart_at[0] == 201.0
+
+
+def test_smtp_failure_is_parked_in_retry_queue():
+    """Test that a send failure after rendering still reaches the retry queue"""
+    worker = EmailWorker()
+    channel = MagicMock()
+    message = {"notification_id": 1, "recipient": "r", "template_code": "t", "priority": 0, "retry_count": 1}
+    
+    with patch.object(worker, 'render_template', return_value={"subject": "Hi", "body": "<p>Hello</p>"}), \
+            patch.object(worker.email_sender, 'send_email', side_effect=Exception("SMTP unavailable")):
+        worker.process_message(channel, Mock(delivery_tag=1), Mock(correlation_id="c"), json.dumps(message).encode())
+    
+    kwargs = channel.basic_publish.call_args.kwargs
+    assert kwargs["exchange"] == "email.retry.4000"
+    assert kwargs["routing_key"] == "email.queue"
+    assert json.loads(kwargs["body"])["retry_count"] == 2
+    channel.basic_ack.assert_called_once_with(delivery_tag=1)
+    channel.basic_nack.assert_not_called()
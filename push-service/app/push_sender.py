@@ -3,7 +3,6 @@ import os
 from typing import Dict, Any, Optional
 
 from app.utils.logging_config import setup_logging
-from app.utils.retry_handler import retry_with_backoff
 from app.utils.circuit_breaker import circuit_breaker
 
 logger = setup_logging("push-sender")
@@ -42,7 +41,6 @@ class PushSender:
         except Exception as e:
             logger.error(f"Failed to initialize FCM: {str(e)}")
     
-    @retry_with_backoff(max_retries=3, base_delay=2.0, exceptions=(Exception,))
     @circuit_breaker(failure_threshold=5, recovery_timeout=60, expected_exception=Exception)
     def send_push(
         self,
@@ -53,7 +51,10 @@ class PushSender:
         image_url: Optional[str] = None
     ) -> bool:
         """
-        Sends a push notification with retry and circuit breaker protection.
+        Sends a push notification with circuit breaker protection.
+        
+        Failures are raised straight away; the worker retries them
+        through the delayed retry queues.
         
         Args:
             device_token: The FCM device token.
@@ -0,0 +1,126 @@
+"""asyncio consumer runtime: each delivery runs as a task on one event loop"""
+import asyncio
+import contextvars
+import functools
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+import aio_pika
+
+from app.utils.logging_config import setup_logging
+from app.utils.supervisor import accept_shutdown_signals
+
+logger = setup_logging("async-consumer")
+
+class AsyncConsumer:
+    """Consumes queues on an event loop, running each message as a task.
+
+    At most `concurrency` handlers run at once; the broker keeps the
+    per-queue prefetch worth of further messages waiting in process.
+    Handlers settle their own messages; one that raises is rejected to
+    the dead letter queue. Heartbeats keep flowing while handlers wait on
+    I/O, and blocking library calls go through run_blocking so they
+    cannot stall the loop.
+    """
+
+    def __init__(
+        self,
+        rabbitmq_url: str,
+        queues: Dict[str, int],
+        handler: Callable[[aio_pika.abc.AbstractIncomingMessage], Awaitable[None]],
+        setup: Optional[Callable[[aio_pika.abc.AbstractChannel], Awaitable[None]]] = None,
+        concurrency: int = 200,
+        shutdown_timeout: float = 30.0,
+        name: str = "worker"
+    ):
+        self.rabbitmq_url = rabbitmq_url
+        self.queues = queues
+        self.handler = handler
+        self.setup = setup
+        self.concurrency = concurrency
+        self.shutdown_timeout = shutdown_timeout
+        self.name = name
+        self.connection = None
+        self.channel = None
+        self.executor = None
+        self._slots = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._consumers = []
+        self._stopped = None
+
+    async def start(self):
+        """Connect, declare topology via `setup` and start the consumers (queue: prefetch)"""
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._stopped = asyncio.Event()
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"{self.name}-io")
+        self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
+        self.channel = await self.connection.channel()
+        if self.setup is not None:
+            await self.setup(self.channel)
+
+        # Prefetch applies to consumers started after it is set, so each queue gets its own share
+        for queue_name, prefetch in self.queues.items():
+            await self.channel.set_qos(prefetch_count=prefetch)
+            queue = await self.channel.get_queue(queue_name, ensure=False)
+            self._consumers.append((queue, await queue.consume(self._on_message)))
+        logger.info(f"{self.name} consuming {list(self.queues)} with up to {self.concurrency} messages in flight")
+
+    async def run(self):
+        """Start, then consume until SIGINT/SIGTERM or stop()"""
+        await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopped.set)
+        accept_shutdown_signals()
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Stop consuming, let in-flight messages finish, then close the connection"""
+        if self._stopped is not None:
+            self._stopped.set()
+        for queue, consumer_tag in self._consumers:
+            try:
+                await queue.cancel(consumer_tag)
+            except Exception as e:
+                logger.error(f"Error cancelling consumer on {queue.name}: {str(e)}")
+        self._consumers = []
+
+        if self._tasks:
+            logger.info(f"Waiting for {len(self._tasks)} in-flight messages")
+            _, pending = await asyncio.wait(self._tasks, timeout=self.shutdown_timeout)
+            # Anything still running is redelivered once the channel closes
+            for task in pending:
+                task.cancel()
+
+        if self.connection is not None and not self.connection.is_closed:
+            await self.connection.close()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        logger.info(f"{self.name} stopped")
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run a blocking call (SMTP, SDK clients) on the I/O thread pool, keeping the log context"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, functools.partial(context.run, func, *args, **kwargs))
+
+    async def _on_message(self, message: aio_pika.abc.AbstractIncomingMessage):
+        task = asyncio.create_task(self._handle(message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, message: aio_pika.abc.AbstractIncomingMessage):
+        async with self._slots:
+            try:
+                await self.handler(message)
+            except Exception as e:
+                logger.error(f"Unhandled error processing message, rejecting it: {str(e)}")
+                try:
+                    await message.nack(requeue=False)
+                except Exception as nack_error:
+                    logger.error(f"Error rejecting message: {str(nack_error)}")
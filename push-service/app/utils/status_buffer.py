@@ -0,0 +1,112 @@
+"""Coalescing buffer for notification status updates sent to the API Gateway"""
+import threading
+import requests
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.utils.logging_config import setup_logging
+
+logger = setup_logging("status-buffer")
+
+class StatusUpdateBuffer:
+    """Collects status updates and posts them to the gateway in batches.
+
+    A background thread, started by start(), flushes whenever max_items
+    updates are waiting or max_delay_ms has passed since the first one, so
+    the gateway applies a few bulk statements per second instead of one
+    per delivered message.
+    """
+
+    def __init__(
+        self,
+        gateway_url: str,
+        max_items: int = 100,
+        max_delay_ms: int = 200,
+        max_pending: int = 10000,
+        timeout: float = 5.0
+    ):
+        self.batch_url = f"{gateway_url}/api/v1/notifications/status/batch"
+        self.max_items = max_items
+        self.max_delay = max_delay_ms / 1000
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._pending: List[Dict] = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    def start(self):
+        """Start the background flusher thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="status-buffer", daemon=True)
+            self._thread.start()
+
+    def add(self, notification_id: int, status: str, error_message: Optional[str] = None):
+        """Queue a status update for the next batch"""
+        update = {
+            "notification_id": str(notification_id),
+            "status": status,
+            "timestamp": datetime.utcnow().isoformat(),
+            "error": error_message
+        }
+        with self._condition:
+            self._pending.append(update)
+            if len(self._pending) >= self.max_items:
+                self._condition.notify()
+
+    def flush(self):
+        """Send everything buffered so far"""
+        with self._condition:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._send(batch)
+
+    def close(self):
+        """Stop the flusher thread after sending what is left"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout * 2)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if self._closed:
+                    return
+                # Give the batch up to max_delay to fill before sending it
+                self._condition.wait_for(
+                    lambda: len(self._pending) >= self.max_items or self._closed,
+                    timeout=self.max_delay
+                )
+                batch, self._pending = self._pending[:self.max_items], self._pending[self.max_items:]
+
+            if self._send(batch):
+                failures = 0
+                continue
+
+            # Back off while the gateway is unavailable instead of retrying in a tight loop
+            failures += 1
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed, timeout=min(self.max_delay * (2 ** failures), 30.0))
+
+    def _send(self, batch: List[Dict]) -> bool:
+        try:
+            response = self.session.post(self.batch_url, json={"updates": batch}, timeout=self.timeout)
+            response.raise_for_status()
+            skipped = response.json().get("data", {}).get("skipped", [])
+            if skipped:
+                logger.warning(f"Status updates skipped (unknown or stale): {skipped}")
+            logger.info(f"Flushed {len(batch)} status updates")
+            return True
+        except Exception as e:
+            logger.error(f"Error flushing {len(batch)} status updates: {str(e)}")
+            # Put the batch back for the next flush, dropping the oldest if the gateway stays down
+            with self._condition:
+                self._pending = (batch + self._pending)[-self.max_pending:]
+            return False